@@ -0,0 +1,75 @@
+import json
+import platform
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from products.benchmarks.cart import run_cart_benchmark, run_restore_benchmark
+from products.benchmarks.catalog import seed_catalog
+from products.benchmarks.runner import benchmark_database, get_git_commit
+
+
+class Command(BaseCommand):
+    help = (
+        "Time GET /api/cart/ for carts of several sizes, and restoring carts "
+        "with single and batch requests, in a throwaway test database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lines",
+            type=int,
+            nargs="+",
+            default=[1, 50, 500],
+            help="Cart sizes to measure",
+        )
+        parser.add_argument(
+            "--restore",
+            type=int,
+            nargs="+",
+            default=[40],
+            help="Cart sizes to restore with single and batch requests",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Requests per measurement"
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            default="benchmark_cart.json",
+            help="JSON file the results are written to",
+        )
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            # Extra products make up for the inactive ones seed_catalog creates
+            sizes = [*options["lines"], *options["restore"]]
+            seed_catalog(max(sizes) * 2, parameters=True)
+            results = run_cart_benchmark(options["lines"], options["repeat"])
+            restore = run_restore_benchmark(options["restore"], options["repeat"])
+
+        for result in results:
+            self.stdout.write(
+                f"{result['lines']:>6} lines {result['milliseconds']:>9.2f} ms "
+                f"{result['queries']:>3} queries"
+            )
+        for result in restore:
+            self.stdout.write(
+                f"restore {result['lines']:>4} lines {result['method']:<6} "
+                f"{result['requests']:>4} requests "
+                f"{result['milliseconds']:>9.2f} ms {result['queries']:>4} queries"
+            )
+
+        report = {
+            "commit": get_git_commit(),
+            "created_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "results": results,
+            "restore": restore,
+        }
+        with open(options["output"], "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2, sort_keys=True, default=str)
+
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-17 09:46
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_lines_without_supplier(apps, schema_editor):
+    """Fold repeated lines without a supplier product into the oldest one"""
+    CartItem = apps.get_model("cart", "CartItem")
+    duplicates = (
+        CartItem.objects.filter(supplier_product__isnull=True)
+        .values("cart", "product")
+        .annotate(lines=Count("id"), keep=Min("id"), quantity=Sum("quantity"))
+        .filter(lines__gt=1)
+    )
+    for duplicate in duplicates:
+        CartItem.objects.filter(pk=duplicate["keep"]).update(
+            quantity=duplicate["quantity"]
+        )
+        CartItem.objects.filter(
+            cart=duplicate["cart"],
+            product=duplicate["product"],
+            supplier_product__isnull=True,
+        ).exclude(pk=duplicate["keep"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cart", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_lines_without_supplier, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="cartitem",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("supplier_product__isnull", True)),
+                fields=("cart", "product"),
+                name="cartitem_no_supplier",
+            ),
+        ),
+    ]
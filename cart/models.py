@@ -2,7 +2,46 @@ from decimal import Decimal
 
 from django.conf import settings
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import connections, models
+from django.db.models import Count, ExpressionWrapper, F, Prefetch, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from suppliers.offers import best_offer_id
+
+PRICE_FIELD = models.DecimalField(max_digits=10, decimal_places=2)
+CENT = Decimal("0.01")
+
+
+def line_total():
+    """
+    Expression for a cart item's total price: the supplier's price when a
+    supplier product is chosen, else the product's, times the quantity
+    """
+    return ExpressionWrapper(
+        Coalesce("supplier_product__supplier_price", "product__price") * F("quantity"),
+        output_field=PRICE_FIELD,
+    )
+
+
+class CartOperation(models.TextChoices):
+    """What an operation of a batch cart update does to its line"""
+
+    ADD = "add", "Add"
+    SET = "set", "Set"
+    REMOVE = "remove", "Remove"
+
+
+class CartQuerySet(models.QuerySet):
+    def with_items(self):
+        """
+        Load the user and prefetch the items with everything CartSerializer
+        renders
+        """
+        return self.select_related("user").prefetch_related(
+            Prefetch("items", queryset=CartItem.objects.with_details())
+        )
 
 
 class Cart(models.Model):
@@ -18,6 +57,8 @@ class Cart(models.Model):
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Updated At")
     is_active = models.BooleanField(default=True, verbose_name="Is Active")
 
+    objects = CartQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Cart"
         verbose_name_plural = "Carts"
@@ -25,15 +66,44 @@ class Cart(models.Model):
     def __str__(self):
         return f"Cart of {self.user.email}"
 
+    @cached_property
+    def totals(self):
+        """
+        Number of items and subtotal in one aggregate query (or from the
+        items of with_items()), computed once per cart instance; use
+        refresh_totals() after changing items
+        """
+        if "items" in getattr(self, "_prefetched_objects_cache", {}):
+            items = self.items.all()
+            subtotal = sum((item.total_price for item in items), Decimal("0"))
+            return {
+                "total_items": len(items),
+                "subtotal": subtotal.quantize(CENT),
+            }
+
+        totals = self.items.aggregate(
+            total_items=Count("id"),
+            subtotal=Coalesce(
+                Sum(line_total()), Value(Decimal("0")), output_field=PRICE_FIELD
+            ),
+        )
+        # SQLite sums decimals as floats
+        totals["subtotal"] = totals["subtotal"].quantize(CENT)
+        return totals
+
+    def refresh_totals(self):
+        self.__dict__.pop("totals", None)
+        getattr(self, "_prefetched_objects_cache", {}).pop("items", None)
+
     @property
     def total_items(self):
         """Get total number of items in cart"""
-        return self.items.count()
+        return self.totals["total_items"]
 
     @property
     def subtotal(self):
         """Calculate subtotal of all items in cart"""
-        return sum(item.total_price for item in self.items.all())
+        return self.totals["subtotal"]
 
     @property
     def total(self):
@@ -44,8 +114,93 @@ class Cart(models.Model):
     def clear(self):
         """Remove all items from cart"""
         self.items.all().delete()
+        self.refresh_totals()
         self.save()
 
+    def apply_operations(self, operations):
+        """
+        Apply validated batch operations (see CartBatchSerializer) with one
+        read of the lines involved and one bulk delete, update and insert.
+        Lines are keyed by product and supplier product. An add or set
+        without a supplier product goes to the product's first line, or to
+        a new line through its best offer; removing a product without a
+        supplier product removes all of its lines. Call inside a transaction
+        that holds the cart.
+        """
+        product_ids = {operation["product_id"] for operation in operations}
+        lines = {
+            (item.product_id, item.supplier_product_id): item
+            for item in self.items.filter(product_id__in=product_ids).order_by("pk")
+        }
+        # Product id -> key of the line writes without a supplier product use
+        product_lines = {}
+        for key in lines:
+            product_lines.setdefault(key[0], key)
+
+        # Line key -> (operation, quantity): ADD adds to the stored quantity,
+        # SET replaces it and REMOVE deletes the line
+        changes = {}
+        for operation in operations:
+            op = operation["op"]
+            product_id = operation["product_id"]
+            key = (product_id, operation.get("supplier_product_id"))
+            if op == CartOperation.REMOVE:
+                if key[1] is None:
+                    keys = [k for k in {*lines, *changes} if k[0] == key[0]]
+                else:
+                    keys = [key]
+                changes.update((k, (CartOperation.REMOVE, 0)) for k in keys)
+                continue
+
+            if key[1] is None:
+                key = product_lines.setdefault(
+                    product_id, (product_id, operation.get("offer_id"))
+                )
+            else:
+                product_lines.setdefault(product_id, key)
+            quantity = operation["quantity"]
+            previous, stored = changes.get(key, (CartOperation.ADD, 0))
+            if op == CartOperation.ADD and previous == CartOperation.ADD:
+                changes[key] = (CartOperation.ADD, stored + quantity)
+            elif op == CartOperation.ADD:
+                # After a SET or REMOVE the result no longer depends on the row
+                changes[key] = (CartOperation.SET, stored + quantity)
+            else:
+                changes[key] = (CartOperation.SET, quantity)
+
+        now = timezone.now()
+        removed, updated, created = [], [], []
+        for (product_id, supplier_product_id), (op, quantity) in changes.items():
+            item = lines.get((product_id, supplier_product_id))
+            if op == CartOperation.REMOVE:
+                if item is not None:
+                    removed.append(item.pk)
+            elif item is None:
+                created.append(
+                    CartItem(
+                        cart=self,
+                        product_id=product_id,
+                        supplier_product_id=supplier_product_id,
+                        quantity=quantity,
+                    )
+                )
+            else:
+                # An F() increment keeps concurrent single adds
+                item.quantity = (
+                    F("quantity") + quantity if op == CartOperation.ADD else quantity
+                )
+                item.updated_at = now
+                updated.append(item)
+
+        if removed:
+            CartItem.objects.filter(pk__in=removed).delete()
+        if updated:
+            CartItem.objects.bulk_update(updated, ["quantity", "updated_at"])
+        if created:
+            # bulk_create skips CartItem.save; suppliers are already chosen
+            CartItem.objects.bulk_create(created)
+        self.refresh_totals()
+
     def merge_with_session_cart(self, session_cart_items):
         """Merge session cart items with user cart (for when user logs in)"""
         for session_item in session_cart_items:
@@ -56,6 +211,54 @@ class Cart(models.Model):
             if not created:
                 cart_item.quantity += session_item["quantity"]
                 cart_item.save()
+        self.refresh_totals()
+
+
+class CartItemQuerySet(models.QuerySet):
+    def with_details(self):
+        """
+        Load everything CartItemSerializer renders: products with their
+        categories and parameters, and supplier products
+        """
+        from products.models import ProductParameter
+
+        return self.select_related(
+            "product__category", "supplier_product"
+        ).prefetch_related(
+            Prefetch(
+                "product__parameters",
+                queryset=ProductParameter.objects.select_related("parameter"),
+            )
+        )
+
+    def add(self, cart_id, product_id, quantity, supplier_product_id=None):
+        """
+        Add quantity of a product to a cart line, creating the line if need
+        be, in a single INSERT ... ON CONFLICT DO UPDATE so that concurrent
+        adds all count. Returns the id of the line.
+        """
+        table = self.model._meta.db_table
+        if supplier_product_id is None:
+            # NULLs never conflict in a unique index; see cartitem_no_supplier
+            conflict = "(cart_id, product_id) WHERE supplier_product_id IS NULL"
+        else:
+            conflict = "(cart_id, product_id, supplier_product_id)"
+
+        connection = connections[self.db]
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} "
+                f"(cart_id, product_id, supplier_product_id, quantity, "
+                f"added_at, updated_at) "
+                f"VALUES (%s, %s, %s, %s, %s, %s) "
+                f"ON CONFLICT {conflict} DO UPDATE SET "
+                f"quantity = {table}.quantity + excluded.quantity, "
+                f"updated_at = excluded.updated_at "
+                f"RETURNING id",
+                [cart_id, product_id, supplier_product_id, quantity, now, now],
+            )
+            return cursor.fetchone()[0]
 
 
 class CartItem(models.Model):
@@ -80,10 +283,20 @@ class CartItem(models.Model):
     added_at = models.DateTimeField(auto_now_add=True, verbose_name="Added At")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Updated At")
 
+    objects = CartItemQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Cart Item"
         verbose_name_plural = "Cart Items"
         unique_together = ["cart", "product", "supplier_product"]
+        constraints = [
+            # unique_together lets lines without a supplier product repeat
+            models.UniqueConstraint(
+                fields=["cart", "product"],
+                condition=models.Q(supplier_product__isnull=True),
+                name="cartitem_no_supplier",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.quantity} x {self.product.name}"
@@ -111,12 +324,7 @@ class CartItem(models.Model):
         return self.product.quantity >= self.quantity
 
     def save(self, *args, **kwargs):
-        """Auto-select supplier product if not specified"""
-        if self.product and not self.supplier_product:
-            # Try to find an available supplier product
-            supplier_product = self.product.supplier_products.filter(
-                is_available=True, supplier__accepts_orders=True
-            ).first()
-            if supplier_product:
-                self.supplier_product = supplier_product
+        """Auto-select the product's best offer if no supplier product is given"""
+        if self.product_id and not self.supplier_product_id:
+            self.supplier_product_id = best_offer_id(self.product_id)
         super().save(*args, **kwargs)
@@ -1,19 +1,32 @@
+from django.conf import settings
+from django.db.models import F
 from rest_framework import serializers
 
+from products.fieldsets import Fieldset
 from products.models import Product
-from products.serializers import ProductSerializer
+from products.serializers import ProductReadSerializer
 from suppliers.models import SupplierProduct
+from suppliers.offers import orderable_offers
 from suppliers.serializers import SupplierProductSerializer
 
-from .models import Cart, CartItem
+from .models import Cart, CartItem, CartOperation
+
+# The supplier product's own product is the line's product, so it is
+# rendered as an id and filled in from the line (see to_representation)
+SUPPLIER_PRODUCT_FIELDSET = Fieldset(
+    ("id", "product", "supplier_price", "supplier_quantity", "is_available"),
+    frozenset(),
+)
 
 
 class CartItemSerializer(serializers.ModelSerializer):
-    product = ProductSerializer(read_only=True)
+    product = ProductReadSerializer(read_only=True)
     product_id = serializers.PrimaryKeyRelatedField(
         queryset=Product.objects.all(), source="product", write_only=True
     )
-    supplier_product = SupplierProductSerializer(read_only=True)
+    supplier_product = SupplierProductSerializer(
+        read_only=True, fieldset=SUPPLIER_PRODUCT_FIELDSET
+    )
     supplier_product_id = serializers.PrimaryKeyRelatedField(
         queryset=SupplierProduct.objects.filter(
             is_available=True, supplier__accepts_orders=True
@@ -62,6 +75,18 @@ class CartItemSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Quantity must be at least 1")
         return value
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        supplier_product = data.get("supplier_product")
+        if supplier_product is not None:
+            if supplier_product["product"] == instance.product_id:
+                supplier_product["product"] = data["product"]
+            else:
+                supplier_product["product"] = ProductReadSerializer(
+                    instance.supplier_product.product, context=self.context
+                ).data
+        return data
+
 
 class CartSerializer(serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
@@ -92,3 +117,76 @@ class CartSerializer(serializers.ModelSerializer):
             "subtotal",
             "total",
         ]
+
+
+class CartOperationSerializer(serializers.Serializer):
+    """One line change of a batch cart update"""
+
+    op = serializers.ChoiceField(
+        choices=CartOperation.choices, default=CartOperation.ADD
+    )
+    product_id = serializers.IntegerField()
+    supplier_product_id = serializers.IntegerField(required=False, allow_null=True)
+    quantity = serializers.IntegerField(min_value=1, required=False)
+
+    def validate(self, attrs):
+        if attrs["op"] == CartOperation.REMOVE:
+            attrs.pop("quantity", None)
+        elif "quantity" not in attrs:
+            if attrs["op"] == CartOperation.SET:
+                raise serializers.ValidationError(
+                    {"quantity": "This field is required."}
+                )
+            attrs["quantity"] = 1
+        return attrs
+
+
+class CartBatchSerializer(serializers.Serializer):
+    """
+    Operations applied in order by Cart.apply_operations. Products and
+    supplier products are checked for all of them at once; adds and sets
+    without a supplier product carry the product's best offer as offer_id,
+    used when the cart has no line of the product yet.
+    """
+
+    operations = CartOperationSerializer(many=True, allow_empty=False)
+
+    def validate_operations(self, operations):
+        limit = settings.CART_BATCH_MAX_OPERATIONS
+        if len(operations) > limit:
+            raise serializers.ValidationError(
+                f"Ensure this field has no more than {limit} operations."
+            )
+
+        writes = [op for op in operations if op["op"] != CartOperation.REMOVE]
+        products = dict(
+            Product.objects.filter(
+                pk__in={op["product_id"] for op in writes}, is_active=True
+            )
+            .annotate(offer_id=F("best_offer__supplier_product"))
+            .values_list("pk", "offer_id")
+        )
+        offer_ids = {op.get("supplier_product_id") for op in writes} - {None}
+        offers = (
+            dict(orderable_offers(pk__in=offer_ids).values_list("pk", "product_id"))
+            if offer_ids
+            else {}
+        )
+
+        errors = []
+        for op in operations:
+            error = {}
+            if op["op"] != CartOperation.REMOVE:
+                supplier_product_id = op.get("supplier_product_id")
+                if op["product_id"] not in products:
+                    error["product_id"] = ["Product not found or not active"]
+                elif supplier_product_id is None:
+                    op["offer_id"] = products[op["product_id"]]
+                elif offers.get(supplier_product_id) != op["product_id"]:
+                    error["supplier_product_id"] = [
+                        "Supplier product not available for this product"
+                    ]
+            errors.append(error)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return operations
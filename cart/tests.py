@@ -1,3 +1,200 @@
-from django.test import TestCase
+import threading
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Count, Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from products.benchmarks.cart import CART_BATCH_URL, CART_URL, fill_cart
+from products.benchmarks.catalog import seed_catalog
+from products.models import Category, Product
+from products.tests import LOCMEM_CACHES
+from suppliers.models import Supplier, SupplierProduct
+
+from .models import Cart, CartItem
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CartQueryTests(TestCase):
+    """Reading and restoring a cart takes as many queries for 1 line as for 50"""
+
+    sizes = [1, 50]
+
+    @classmethod
+    def setUpTestData(cls):
+        # Extra products make up for the inactive ones seed_catalog creates
+        seed_catalog(max(cls.sizes) * 2, parameters=True)
+
+    def test_totals_take_one_query(self):
+        for lines in self.sizes:
+            with self.subTest(lines=lines):
+                cart = Cart.objects.get(user=fill_cart(lines, f"totals{lines}"))
+                with self.assertNumQueries(1):
+                    cart.total_items, cart.subtotal, cart.total
+
+    def test_get_takes_three_queries(self):
+        for lines in self.sizes:
+            with self.subTest(lines=lines):
+                client = APIClient()
+                client.force_authenticate(fill_cart(lines, f"get{lines}"))
+                with self.assertNumQueries(3):
+                    response = client.get(CART_URL)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()["items"]), lines)
+
+    def test_batch_restore_takes_a_fixed_number_of_queries(self):
+        products = Product.objects.filter(is_active=True).order_by("pk")
+        for lines in self.sizes:
+            with self.subTest(lines=lines):
+                user = get_user_model().objects.create_user(
+                    username=f"restore{lines}", email=f"restore{lines}@example.com"
+                )
+                client = APIClient()
+                client.force_authenticate(user)
+                operations = [
+                    {"product_id": product_id, "quantity": 1}
+                    for product_id in products.values_list("pk", flat=True)[:lines]
+                ]
+                # The transaction is a savepoint inside the test's, which
+                # adds SAVEPOINT and RELEASE to the count
+                with self.assertNumQueries(9):
+                    response = client.post(
+                        CART_BATCH_URL, {"operations": operations}, format="json"
+                    )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(user.cart.items.count(), lines)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ConcurrentAddTests(TransactionTestCase):
+    """Adds of the same products from many threads at once all count"""
+
+    threads = 8
+    adds = 25
+
+    def setUp(self):
+        category = Category.objects.create(name="Phones")
+        self.plain, self.offered = (
+            Product.objects.create(name=name, category=category, price=10)
+            for name in ["Plain", "Offered"]
+        )
+        supplier = Supplier.objects.create(name="Supplier", email="s@example.com")
+        self.offer = SupplierProduct.objects.create(
+            supplier=supplier,
+            product=self.offered,
+            supplier_price=9,
+            supplier_quantity=100,
+        )
+        user = get_user_model().objects.create_user(username="concurrency")
+        self.cart = Cart.objects.get(user=user)
+
+    def add(self, errors):
+        try:
+            for _ in range(self.adds):
+                CartItem.objects.add(self.cart.pk, self.plain.pk, 1)
+                CartItem.objects.add(self.cart.pk, self.offered.pk, 1, self.offer.pk)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connection.close()
+
+    def test_concurrent_adds_keep_one_line_per_product_with_every_add(self):
+        errors = []
+        threads = [
+            threading.Thread(target=self.add, args=(errors,))
+            for _ in range(self.threads)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        lines = (
+            CartItem.objects.filter(cart=self.cart)
+            .values("product_id", "supplier_product_id")
+            .annotate(lines=Count("id"), quantity=Sum("quantity"))
+        )
+        expected = self.threads * self.adds
+        self.assertCountEqual(
+            lines,
+            [
+                {
+                    "product_id": self.plain.pk,
+                    "supplier_product_id": None,
+                    "lines": 1,
+                    "quantity": expected,
+                },
+                {
+                    "product_id": self.offered.pk,
+                    "supplier_product_id": self.offer.pk,
+                    "lines": 1,
+                    "quantity": expected,
+                },
+            ],
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CartLineTests(TestCase):
+    """Adds without a supplier product go to the product's line in the cart"""
+
+    def setUp(self):
+        self.product = Product.objects.create(
+            name="Phone", category=Category.objects.create(name="Phones"), price=10
+        )
+        self.first = self.make_offer("First", price=9)
+        user = get_user_model().objects.create_user(username="lines")
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.cart = user.cart
+
+    def make_offer(self, name, price):
+        supplier = Supplier.objects.create(name=name, email=f"{name}@example.com")
+        return SupplierProduct.objects.create(
+            supplier=supplier,
+            product=self.product,
+            supplier_price=price,
+            supplier_quantity=100,
+        )
+
+    def lines(self):
+        return list(self.cart.items.values_list("supplier_product_id", "quantity"))
+
+    def test_add_keeps_its_line_when_the_best_offer_changes(self):
+        self.client.post(CART_URL, {"product_id": self.product.pk})
+        self.make_offer("Cheaper", price=5)
+        response = self.client.post(CART_URL, {"product_id": self.product.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.lines(), [(self.first.pk, 2)])
+
+    def test_add_keeps_a_line_without_supplier_when_an_offer_appears(self):
+        self.first.delete()
+        self.client.post(CART_URL, {"product_id": self.product.pk})
+        self.make_offer("New", price=5)
+        self.client.post(CART_URL, {"product_id": self.product.pk})
+        self.assertEqual(self.lines(), [(None, 2)])
+
+    def test_batch_writes_keep_their_line_when_the_best_offer_changes(self):
+        self.client.post(CART_URL, {"product_id": self.product.pk})
+        self.make_offer("Cheaper", price=5)
+        operations = [
+            {"product_id": self.product.pk, "quantity": 2},
+            {"op": "set", "product_id": self.product.pk, "quantity": 4},
+            {"product_id": self.product.pk},
+        ]
+        response = self.client.post(
+            CART_BATCH_URL, {"operations": operations}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.lines(), [(self.first.pk, 5)])
+
+    def test_new_lines_use_the_best_offer(self):
+        cheaper = self.make_offer("Cheaper", price=5)
+        self.client.post(
+            CART_BATCH_URL,
+            {"operations": [{"product_id": self.product.pk}] * 2},
+            format="json",
+        )
+        self.assertEqual(self.lines(), [(cheaper.pk, 2)])
@@ -4,4 +4,5 @@ from . import views
 
 urlpatterns = [
     path("", views.CartView.as_view(), name="cart"),
+    path("batch/", views.CartBatchView.as_view(), name="cart-batch"),
 ]
@@ -1,3 +1,5 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F, OuterRef, Subquery
 from rest_framework import permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -5,7 +7,7 @@ from rest_framework.views import APIView
 from products.models import Product
 
 from .models import Cart, CartItem
-from .serializers import CartItemSerializer, CartSerializer
+from .serializers import CartBatchSerializer, CartItemSerializer, CartSerializer
 
 
 class CartView(APIView):
@@ -13,7 +15,7 @@ class CartView(APIView):
 
     def get(self, request):
         """Get user's cart"""
-        cart, created = Cart.objects.get_or_create(user=request.user)
+        cart, created = Cart.objects.with_items().get_or_create(user=request.user)
         serializer = CartSerializer(cart)
         return Response(serializer.data)
 
@@ -21,7 +23,6 @@ class CartView(APIView):
         """Add item to cart"""
         cart, created = Cart.objects.get_or_create(user=request.user)
         product_id = request.data.get("product_id")
-        quantity = int(request.data.get("quantity", 1))
 
         if not product_id:
             return Response(
@@ -29,23 +30,42 @@ class CartView(APIView):
             )
 
         try:
-            product = Product.objects.get(id=product_id, is_active=True)
-        except Product.DoesNotExist:
+            quantity = int(request.data.get("quantity", 1))
+        except (TypeError, ValueError):
+            quantity = 0
+        if quantity < 1:
+            return Response(
+                {"error": "quantity must be a whole number of at least 1"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # The product, its first line in the cart and the offer CartItem.save
+        # would pick, in one query
+        line = cart.items.filter(product=OuterRef("pk")).order_by("pk")
+        try:
+            product = (
+                Product.objects.filter(id=product_id, is_active=True)
+                .annotate(
+                    offer_id=F("best_offer__supplier_product"),
+                    line_id=Subquery(line.values("pk")[:1]),
+                    line_offer_id=Subquery(line.values("supplier_product")[:1]),
+                )
+                .values("id", "offer_id", "line_id", "line_offer_id")
+                .get()
+            )
+        except (Product.DoesNotExist, ValueError):
             return Response(
                 {"error": "Product not found or not active"},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        # Check if item already in cart
-        cart_item = CartItem.objects.filter(cart=cart, product=product).first()
-
-        if cart_item:
-            cart_item.quantity += quantity
-            cart_item.save()
+        # Keep adding to the product's line when its best offer has changed
+        if product["line_id"] is not None:
+            offer_id = product["line_offer_id"]
         else:
-            cart_item = CartItem.objects.create(
-                cart=cart, product=product, quantity=quantity
-            )
+            offer_id = product["offer_id"]
+        item_id = CartItem.objects.add(cart.pk, product["id"], quantity, offer_id)
+        cart_item = CartItem.objects.with_details().get(pk=item_id)
 
         serializer = CartItemSerializer(cart_item)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -55,3 +75,32 @@ class CartView(APIView):
         cart, created = Cart.objects.get_or_create(user=request.user)
         cart.items.all().delete()
         return Response({"message": "Cart cleared"}, status=status.HTTP_200_OK)
+
+
+class CartBatchView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        """
+        Apply a list of add, set and remove operations to the cart in one
+        transaction and return the updated cart
+        """
+        serializer = CartBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            with transaction.atomic():
+                # Locking the cart serializes batches of the same user
+                cart, created = Cart.objects.select_for_update().get_or_create(
+                    user=request.user
+                )
+                cart.apply_operations(serializer.validated_data["operations"])
+        except IntegrityError:
+            # A concurrent request created one of the new lines first
+            return Response(
+                {"error": "Cart was changed by another request, please retry"},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        cart = Cart.objects.with_items().get(pk=cart.pk)
+        return Response(CartSerializer(cart).data)
@@ -1,19 +1,23 @@
-from decimal import Decimal
-
-import yaml
 from django import forms
+from django.conf import settings
 from django.contrib import admin, messages
 from django.shortcuts import redirect, render
 from django.urls import path
 
-from suppliers.models import Supplier, SupplierProduct
-
-from .models import Category, Product
+from .models import Category, ImportJob, Product
+from .tasks import start_import_job
 
 
 class ImportYAMLForm(forms.Form):
     supplier = forms.CharField(max_length=200, required=True)
-    yaml_data = forms.CharField(widget=forms.Textarea, required=True)
+    yaml_file = forms.FileField(required=True)
+
+    def clean_yaml_file(self):
+        yaml_file = self.cleaned_data["yaml_file"]
+        max_size = settings.YAML_IMPORT_MAX_UPLOAD_SIZE
+        if yaml_file.size > max_size:
+            raise forms.ValidationError(f"File is larger than {max_size} bytes")
+        return yaml_file
 
 
 @admin.register(Category)
@@ -22,6 +26,20 @@ class CategoryAdmin(admin.ModelAdmin):
     search_fields = ("name",)
 
 
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "supplier_name",
+        "status",
+        "created_by",
+        "created_at",
+        "finished_at",
+    )
+    list_filter = ("status",)
+    readonly_fields = ("stats", "error", "created_at", "started_at", "finished_at")
+
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ("name", "category", "price", "quantity", "is_active", "created_at")
@@ -45,32 +63,27 @@ class ProductAdmin(admin.ModelAdmin):
     def import_yaml_view(self, request):
         """Admin view for importing YAML"""
         if request.method == "POST":
-            form = ImportYAMLForm(request.POST)
+            form = ImportYAMLForm(request.POST, request.FILES)
             if form.is_valid():
-                supplier_name = form.cleaned_data["supplier"]
-                yaml_data = form.cleaned_data["yaml_data"]
-
-                try:
-                    data = yaml.safe_load(yaml_data)
-
-                    # Import the data
-                    from .views import import_yaml_data
-
-                    stats = import_yaml_data(data, supplier_name)
+                job = start_import_job(
+                    form.cleaned_data["yaml_file"],
+                    form.cleaned_data["supplier"],
+                    user=request.user,
+                )
 
+                if job.status == ImportJob.Status.SUCCESS:
                     messages.success(
                         request,
                         f"Import successful! "
-                        f"Created {stats['products_created']} products, "
-                        f"updated {stats['products_updated']} products.",
+                        f"Created {job.stats['products_created']} products, "
+                        f"updated {job.stats['products_updated']} products.",
                     )
+                elif job.status == ImportJob.Status.FAILED:
+                    messages.error(request, f"Import failed: {job.error}")
+                else:
+                    messages.info(request, f"Import job #{job.pk} queued.")
 
-                    return redirect("..")
-
-                except yaml.YAMLError as e:
-                    messages.error(request, f"Invalid YAML: {e}")
-                except Exception as e:
-                    messages.error(request, f"Import failed: {e}")
+                return redirect("..")
         else:
             form = ImportYAMLForm()
 
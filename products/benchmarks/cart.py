@@ -0,0 +1,136 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from rest_framework.test import APIClient
+
+from cart.models import Cart, CartItem
+from products.models import Product
+from suppliers.models import Supplier, SupplierProduct
+
+from .catalog import time_request
+from .runner import QueryCounter
+
+CART_URL = "/api/cart/"
+CART_BATCH_URL = "/api/cart/batch/"
+
+
+def fill_cart(lines, username="benchmark"):
+    """
+    A user whose cart holds lines products from the seeded catalog, every
+    other one through a supplier offer
+    """
+    user = get_user_model().objects.create_user(
+        username=username, email=f"{username}@example.com"
+    )
+    # Users get an empty cart on creation
+    cart, _ = Cart.objects.get_or_create(user=user)
+    supplier = Supplier.objects.create(
+        name=f"Supplier of {username}", email=f"{username}@example.com"
+    )
+
+    products = list(Product.objects.filter(is_active=True).order_by("pk")[:lines])
+    if len(products) < lines:
+        raise ValueError(f"Only {len(products)} active products to fill the cart")
+    offers = {
+        offer.product_id: offer
+        for offer in SupplierProduct.objects.bulk_create(
+            SupplierProduct(
+                supplier=supplier,
+                product=product,
+                supplier_price=product.price * 9 / 10,
+                supplier_quantity=100,
+            )
+            for product in products[::2]
+        )
+    }
+    # bulk_create skips CartItem.save, which would pick the offers itself
+    CartItem.objects.bulk_create(
+        CartItem(
+            cart=cart,
+            product=product,
+            supplier_product=offers.get(product.pk),
+            quantity=index % 3 + 1,
+        )
+        for index, product in enumerate(products)
+    )
+    return user
+
+
+def run_cart_benchmark(sizes, repeat=5):
+    """Latency and queries of GET /api/cart/ for carts of every size"""
+    results = []
+    for lines in sizes:
+        client = APIClient()
+        client.force_authenticate(fill_cart(lines, username=f"cart{lines}"))
+        milliseconds, queries = time_request(client, CART_URL, repeat)
+        results.append(
+            {"lines": lines, "milliseconds": milliseconds, "queries": queries}
+        )
+    return results
+
+
+def restore_requests(client, product_ids):
+    """
+    Per method, a function that puts products back into an empty cart and
+    returns the responses: one POST per product and a GET of the cart, or
+    a single batch POST
+    """
+    operations = [
+        {"product_id": product_id, "quantity": index % 3 + 1}
+        for index, product_id in enumerate(product_ids)
+    ]
+    return {
+        "single": lambda: [
+            *(
+                client.post(CART_URL, operation, format="json")
+                for operation in operations
+            ),
+            client.get(CART_URL),
+        ],
+        "batch": lambda: [
+            client.post(CART_BATCH_URL, {"operations": operations}, format="json")
+        ],
+    }
+
+
+def run_restore_benchmark(sizes, repeat=5):
+    """
+    Latency and queries of restoring carts of every size with single adds
+    and with one batch request
+    """
+    results = []
+    for lines in sizes:
+        client = APIClient()
+        user = get_user_model().objects.create_user(
+            username=f"restore{lines}", email=f"restore{lines}@example.com"
+        )
+        client.force_authenticate(user)
+        product_ids = list(
+            Product.objects.filter(is_active=True)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:lines]
+        )
+        for method, restore in restore_requests(client, product_ids).items():
+            timings = []
+            counter = QueryCounter()
+            for _ in range(repeat):
+                CartItem.objects.filter(cart__user=user).delete()
+                counter.count = 0
+                start = time.perf_counter()
+                with connection.execute_wrapper(counter):
+                    responses = restore()
+                timings.append((time.perf_counter() - start) * 1000)
+                for response in responses:
+                    assert response.status_code == 200, response.content[:200]
+            results.append(
+                {
+                    "lines": lines,
+                    "method": method,
+                    "requests": len(responses),
+                    "milliseconds": round(statistics.median(timings), 2),
+                    "queries": counter.count,
+                }
+            )
+    return results
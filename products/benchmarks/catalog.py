@@ -0,0 +1,196 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db import connection
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from products.cache import bump_catalog_version
+from products.models import Category, Parameter, Product, ProductParameter
+from products.pagination import KeysetPagination
+
+from .feed_generator import COLORS, WORDS
+from .runner import QueryCounter
+
+PRODUCTS_URL = "/api/products/products/"
+
+BRANDS = ["Apple", "Samsung", "Xiaomi", "Bosch", "Philips", "Sony", "Lenovo", "Asus"]
+SERIES = ["X", "S", "Pro", "Max", "Lite", "Plus"]
+
+
+def seed_catalog(products, categories=50, parameters=False, seed=0, batch_size=10000):
+    """
+    Fill the database with products spread over categories and dates,
+    optionally with a colour parameter per product. Bulk inserts skip
+    signals, so search indexes have to be rebuilt afterwards.
+    """
+    rng = random.Random(seed)
+    category_objs = Category.objects.bulk_create(
+        [Category(name=f"Benchmark category {i}") for i in range(categories)]
+    )
+    color = Parameter.objects.get_or_create(name="Цвет")[0] if parameters else None
+
+    # Spread created_at over a year instead of stamping every row with now()
+    created_at = Product._meta.get_field("created_at")
+    created_at.auto_now_add = False
+    start = timezone.now() - timedelta(days=365)
+    try:
+        for offset in range(0, products, batch_size):
+            batch = Product.objects.bulk_create(
+                [
+                    Product(
+                        name=(
+                            f"{rng.choice(WORDS)} {rng.choice(BRANDS)} "
+                            f"{rng.choice(SERIES)}{rng.randrange(1000)}"
+                        ),
+                        description=" ".join(rng.choices(WORDS + BRANDS, k=8)),
+                        category=rng.choice(category_objs),
+                        price=Decimal(rng.randrange(100, 1000000)) / 100,
+                        quantity=rng.choice([0, rng.randrange(1, 500)]),
+                        is_active=rng.random() > 0.05,
+                        created_at=start + timedelta(seconds=rng.randrange(31536000)),
+                    )
+                    for i in range(offset, min(offset + batch_size, products))
+                ]
+            )
+            if color is not None:
+                ProductParameter.objects.bulk_create(
+                    [
+                        ProductParameter(
+                            product=product, parameter=color, value=rng.choice(COLORS)
+                        )
+                        for product in batch
+                    ]
+                )
+    finally:
+        created_at.auto_now_add = True
+
+
+def time_request(client, url, repeat, invalidate=True):
+    """
+    Median latency of GET url in milliseconds and queries per request, with
+    the catalog response cache invalidated so the view itself is timed;
+    pass invalidate=False when responses are not cached
+    """
+    timings = []
+    counter = QueryCounter()
+    for _ in range(repeat):
+        if invalidate:
+            bump_catalog_version()
+        counter.count = 0
+        start = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            response = client.get(url)
+        timings.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.content[:200]
+    return round(statistics.median(timings), 2), counter.count
+
+
+def keyset_url(ordering, page, page_size):
+    """URL of the keyset page that page-number pagination calls `page`"""
+    if page == 1:
+        return f"{PRODUCTS_URL}?pagination=cursor&ordering={ordering}"
+
+    keyset = KeysetPagination()
+    keyset.field = ordering.lstrip("-")
+    keyset.descending = ordering.startswith("-")
+    prefix = "-" if keyset.descending else ""
+    previous = (
+        Product.objects.filter(is_active=True)
+        .order_by(f"{prefix}{keyset.field}", f"{prefix}pk")
+        .only("pk", keyset.field)[(page - 1) * page_size - 1]
+    )
+    return f"{PRODUCTS_URL}?ordering={ordering}&cursor={keyset.make_cursor(previous)}"
+
+
+def run_pagination_benchmark(orderings, pages, repeat=5):
+    """Time page-number and keyset requests for every ordering and page"""
+    page_size = settings.REST_FRAMEWORK["PAGE_SIZE"]
+    client = APIClient()
+    results = []
+    for ordering in orderings:
+        for page in pages:
+            urls = {
+                "page": f"{PRODUCTS_URL}?ordering={ordering}&page={page}",
+                "keyset": keyset_url(ordering, page, page_size),
+            }
+            for pagination, url in urls.items():
+                milliseconds, queries = time_request(client, url, repeat)
+                results.append(
+                    {
+                        "ordering": ordering,
+                        "page": page,
+                        "pagination": pagination,
+                        "milliseconds": milliseconds,
+                        "queries": queries,
+                    }
+                )
+    return results
+
+
+def run_search_benchmark(backends, queries, repeat=5):
+    """
+    Time the first page of ?search= for every backend and query. The
+    version is bumped once before the warm-up request and responses are not
+    cached while timing, as every new catalog version makes the in-memory
+    index catch up with the products table.
+    """
+    client = APIClient()
+    results = []
+    for name, backend_path in backends.items():
+        settings.PRODUCT_SEARCH_BACKEND = backend_path
+        for query in queries:
+            url = f"{PRODUCTS_URL}?{urlencode({'search': query})}"
+            bump_catalog_version()
+            with override_settings(CATALOG_CACHE_TIMEOUT=0):
+                client.get(url)  # warm up; builds the in-memory index
+                milliseconds, queries_count = time_request(
+                    client, url, repeat, invalidate=False
+                )
+                count = client.get(url).json()["count"]
+            results.append(
+                {
+                    "backend": name,
+                    "query": query,
+                    "count": count,
+                    "milliseconds": milliseconds,
+                    "queries": queries_count,
+                }
+            )
+    return results
+
+
+def run_fieldset_benchmark(client, urls, repeat=5):
+    """Payload size, latency and queries of every named URL"""
+    results = []
+    for name, url in urls.items():
+        milliseconds, queries = time_request(client, url, repeat)
+        results.append(
+            {
+                "name": name,
+                "url": url,
+                "bytes": len(client.get(url).content),
+                "milliseconds": milliseconds,
+                "queries": queries,
+            }
+        )
+    return results
+
+
+def time_call(func, repeat=5):
+    """Median latency of func() in milliseconds and queries per call"""
+    timings = []
+    counter = QueryCounter()
+    for _ in range(repeat):
+        counter.count = 0
+        start = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(timings), 2), counter.count
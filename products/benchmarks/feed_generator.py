@@ -0,0 +1,48 @@
+import random
+
+COLORS = ["черный", "белый", "красный", "синий", "золотистый", "серебристый"]
+WORDS = ["Смартфон", "Ноутбук", "Телевизор", "Планшет", "Наушники", "Монитор"]
+
+
+def quote(value):
+    """Quote a string as a YAML double-quoted scalar"""
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def generate_feed(path, goods, categories=50, parameters=5, seed=0):
+    """
+    Write a synthetic supplier feed in the shop1.yaml shape
+    (shop / categories / goods with parameters). Goods are written one at a
+    time, so feeds with millions of goods do not need to fit in memory.
+    """
+    rng = random.Random(seed)
+
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(f"shop: {quote('Benchmark shop')}\n")
+
+        file.write("categories:\n")
+        for category_id in range(1, categories + 1):
+            file.write(f"  - id: {category_id}\n")
+            file.write(f"    name: {quote(f'Категория {category_id}')}\n")
+
+        file.write("goods:\n")
+        for good_id in range(1, goods + 1):
+            word = rng.choice(WORDS)
+            color = rng.choice(COLORS)
+            price = rng.randint(100, 200000)
+            file.write(f"  - id: {good_id}\n")
+            file.write(f"    category: {rng.randint(1, categories)}\n")
+            file.write(f"    model: bench/{word.lower()}/{good_id}\n")
+            file.write(f"    name: {quote(f'{word} Bench {good_id} ({color})')}\n")
+            file.write(f"    price: {price}\n")
+            file.write(f"    price_rrc: {price + price // 10}\n")
+            file.write(f"    quantity: {rng.randint(0, 50)}\n")
+            if parameters:
+                file.write("    parameters:\n")
+                file.write(f"      {quote('Цвет')}: {quote(color)}\n")
+                for index in range(1, parameters):
+                    file.write(
+                        f"      {quote(f'Параметр {index}')}: {rng.randint(1, 1000)}\n"
+                    )
+
+    return path
@@ -0,0 +1,101 @@
+import base64
+import json
+import re
+
+from django.db import connection
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from products.models import Category
+from products.pagination import KeysetPagination
+from products.views import ProductViewSet
+
+from .catalog import PRODUCTS_URL
+
+# Query parameter combinations ProductViewSet.get_queryset supports.
+# "<category>" is replaced with a real category id.
+FILTERS = {
+    "none": {},
+    "category": {"category": "<category>"},
+    "price range": {"min_price": "100", "max_price": "500"},
+    "category + price range": {
+        "category": "<category>",
+        "min_price": "100",
+        "max_price": "500",
+    },
+    "in stock": {"in_stock": "true"},
+    "category + in stock": {"category": "<category>", "in_stock": "true"},
+}
+
+ORDERINGS = ["-created_at", "created_at", "price", "-price", "name", "quantity"]
+
+# Scans that read the whole product table instead of an index
+FULL_SCAN_PATTERNS = {
+    "sqlite": re.compile(r"\bSCAN (products_product|\w+ AS products_product)$", re.M),
+    "postgresql": re.compile(r"Seq Scan on products_product\b"),
+}
+SORT_PATTERNS = {
+    "sqlite": re.compile(r"USE TEMP B-TREE FOR ORDER BY"),
+    "postgresql": re.compile(r"\bSort\b"),
+}
+
+
+def get_catalog_queryset(params):
+    """The queryset ProductViewSet.list paginates for these query params"""
+    request = Request(APIRequestFactory().get(PRODUCTS_URL, params))
+    view = ProductViewSet(request=request, format_kwarg=None, action="list", kwargs={})
+    return view.filter_queryset(view.get_queryset())
+
+
+def get_page_querysets(params, page_size):
+    """Page-number and keyset querysets for a page in the middle of the list"""
+    queryset = get_catalog_queryset(params)
+
+    keyset = KeysetPagination()
+    keyset.page_size = page_size
+    keyset.field, keyset.descending = keyset.get_ordering(queryset)
+    middle = queryset[queryset.count() // 2 :].first()
+    cursor = None
+    if middle is not None:
+        token = keyset.make_cursor(middle)
+        cursor = json.loads(base64.urlsafe_b64decode(token))
+
+    return {
+        "page": queryset[:page_size],
+        "keyset": keyset.get_page_queryset(queryset, cursor),
+    }
+
+
+def check_query_plans(page_size=10):
+    """EXPLAIN every filter, ordering and pagination combination"""
+    full_scan = FULL_SCAN_PATTERNS.get(connection.vendor)
+    sort = SORT_PATTERNS.get(connection.vendor)
+    category = Category.objects.filter(products__isnull=False).first()
+
+    results = []
+    for filter_name, filter_params in FILTERS.items():
+        for ordering in ORDERINGS:
+            params = {
+                key: str(category.pk) if value == "<category>" else value
+                for key, value in filter_params.items()
+            }
+            params["ordering"] = ordering
+            for pagination, queryset in get_page_querysets(params, page_size).items():
+                plan = queryset.explain()
+                results.append(
+                    {
+                        "filter": filter_name,
+                        "ordering": ordering,
+                        "pagination": pagination,
+                        "full_scan": bool(full_scan and full_scan.search(plan)),
+                        "sort": bool(sort and sort.search(plan)),
+                        "plan": plan,
+                    }
+                )
+    return results
+
+
+def analyze():
+    """Refresh planner statistics after seeding"""
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
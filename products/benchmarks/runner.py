@@ -0,0 +1,130 @@
+import multiprocessing
+import subprocess
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection, connections
+
+from products.utils.memory import get_peak_rss_mb
+from products.utils.yaml_importer import YAMLImporter
+
+# Importer options for every benchmark mode
+MODES = {
+    "row": {},
+    "bulk": {"bulk": True},
+    "stream": {"stream": True},
+    "incremental": {"stream": True, "incremental": True},
+}
+
+
+@contextmanager
+def benchmark_database(name=None):
+    """
+    A throwaway test database for the duration of a benchmark, with the
+    test client's host allowed; on SQLite, name puts it in that file
+    instead of memory
+    """
+    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, "testserver"]
+    test_settings = connection.settings_dict["TEST"]
+    if name and connection.vendor == "sqlite" and not test_settings.get("NAME"):
+        test_settings["NAME"] = str(name)
+
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False
+    )
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+class QueryCounter:
+    """execute_wrapper that only counts queries, unlike CaptureQueriesContext"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def run_import(feed_path, mode, batch_size):
+    """Import a feed once and measure time, queries and peak memory"""
+    options = dict(MODES[mode])
+    stream = options.pop("stream", False)
+    importer = YAMLImporter(batch_size=batch_size, **options)
+
+    counter = QueryCounter()
+    start = time.perf_counter()
+    with connection.execute_wrapper(counter):
+        stats = importer.import_from_file(
+            feed_path, "Benchmark supplier", stream=stream
+        )
+    seconds = time.perf_counter() - start
+
+    return {
+        "seconds": round(seconds, 3),
+        "queries": counter.count,
+        "peak_rss_mb": round(get_peak_rss_mb() or 0, 1),
+        "stats": stats,
+    }
+
+
+def _run_child(pipe, func, args):
+    try:
+        pipe.send(("ok", func(*args)))
+    except Exception as e:
+        pipe.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        pipe.close()
+
+
+def run_isolated(func, *args):
+    """
+    Run func in a forked process so that its peak RSS is not inflated by
+    earlier runs. Falls back to running inline where fork is unavailable.
+    """
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return func(*args)
+
+    # The child must open its own database connection
+    connections.close_all()
+    context = multiprocessing.get_context("fork")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_run_child, args=(sender, func, args))
+    process.start()
+    status, result = receiver.recv()
+    process.join()
+
+    if status == "error":
+        raise RuntimeError(result)
+    return result
+
+
+def run_scenario(feed_path, mode, batch_size):
+    """Import a feed into an empty database, then import it again"""
+    call_command("flush", interactive=False, verbosity=0)
+
+    results = []
+    for phase in ["initial", "reimport"]:
+        result = run_isolated(run_import, feed_path, mode, batch_size)
+        result["phase"] = phase
+        results.append(result)
+    return results
+
+
+def get_git_commit():
+    """Current git commit, so result files can be compared across commits"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
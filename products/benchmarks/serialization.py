@@ -0,0 +1,61 @@
+import statistics
+import time
+
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from products.models import Product
+from products.serializers import ProductReadSerializer, ProductSerializer
+
+# Serializers compared, by name
+SERIALIZERS = {
+    "model": ProductSerializer,
+    "fast": ProductReadSerializer,
+}
+
+
+def load_products(count):
+    """The first active products, loaded the way the product list loads them"""
+    return list(Product.objects.filter(is_active=True).with_details()[:count])
+
+
+def serializer_context():
+    """Context with a request, so image fields render absolute URLs"""
+    return {"request": Request(APIRequestFactory().get("/api/products/products/"))}
+
+
+def find_differences(products, context, limit=5):
+    """Products whose fast representation differs from ProductSerializer's"""
+    expected = ProductSerializer(products, many=True, context=context).data
+    actual = ProductReadSerializer(products, many=True, context=context).data
+    return [
+        {"id": want["id"], "expected": want, "actual": got}
+        for want, got in zip(expected, actual)
+        if want != got
+    ][:limit]
+
+
+def time_serializer(serializer_class, products, context, repeat):
+    """Median milliseconds to serialize products"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        serializer_class(products, many=True, context=context).data
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def run_serializer_benchmark(products, repeat=20):
+    """Serialization time per 1000 products for every serializer"""
+    context = serializer_context()
+    results = []
+    for name, serializer_class in SERIALIZERS.items():
+        milliseconds = time_serializer(serializer_class, products, context, repeat)
+        results.append(
+            {
+                "serializer": name,
+                "products": len(products),
+                "ms_per_1000": round(milliseconds * 1000 / len(products), 2),
+            }
+        )
+    return results
@@ -0,0 +1,138 @@
+"""
+Versioned response cache for the read-heavy catalog endpoints.
+
+Every cache key includes a catalog version token. Catalog writes replace the
+token once their transaction commits (signals for ORM saves, the importer
+for its bulk writes), so stale entries are never read again and simply
+expire. The token is random rather than a counter, so losing it can never
+bring back the version of an older catalog. Because the version is part of
+the ETag as well, a client that sends If-None-Match gets a 304 without the
+view or the cache entry being touched.
+"""
+
+import hashlib
+from functools import wraps
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+VERSION_KEY = "catalog:version"
+STATS_KEYS = {
+    "hits": "catalog:hits",
+    "misses": "catalog:misses",
+    "not_modified": "catalog:not_modified",
+}
+
+
+def get_catalog_version():
+    version_cache = caches["catalog"]
+    version = version_cache.get(VERSION_KEY)
+    if version is None:
+        version_cache.add(VERSION_KEY, uuid4().hex, timeout=None)
+        version = version_cache.get(VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog response"""
+    caches["catalog"].set(VERSION_KEY, uuid4().hex, timeout=None)
+
+
+def bump_catalog_version_on_commit():
+    """
+    Bump the version once the current transaction (if any) commits; a
+    transaction that saves many rows still bumps it only once
+    """
+    connection = transaction.get_connection()
+    if any(func is bump_catalog_version for _, func, _ in connection.run_on_commit):
+        return
+    transaction.on_commit(bump_catalog_version)
+
+
+def record(stat):
+    stats_cache = caches["catalog"]
+    key = STATS_KEYS[stat]
+    stats_cache.add(key, 0, timeout=None)
+    try:
+        stats_cache.incr(key)
+    except ValueError:
+        pass
+
+
+def get_cache_stats():
+    """Hit, miss and 304 counters with the hit ratio"""
+    stats_cache = caches["catalog"]
+    stats = {stat: stats_cache.get(key, 0) for stat, key in STATS_KEYS.items()}
+    served = stats["hits"] + stats["not_modified"]
+    total = served + stats["misses"]
+    stats["hit_ratio"] = served / total if total else None
+    stats["version"] = get_catalog_version()
+    return stats
+
+
+def reset_cache_stats():
+    caches["catalog"].delete_many(list(STATS_KEYS.values()))
+
+
+def make_cache_key(request, version):
+    """
+    Digest of the catalog version, the URL with its query params sorted (so
+    their order does not matter) and the response format
+    """
+    params = sorted(
+        (key, sorted(request.query_params.getlist(key))) for key in request.query_params
+    )
+    # Pagination links are absolute, so the host is part of the key
+    url = f"{request.scheme}://{request.get_host()}{request.path}?{params}"
+    source = f"{version}:{request.accepted_renderer.format}:{url}"
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+
+def etag_matches(request, etag):
+    """Whether If-None-Match names etag, compared weakly"""
+    header = request.META.get("HTTP_IF_NONE_MATCH")
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return "*" in etags or any(tag.removeprefix("W/") == etag for tag in etags)
+
+
+def cache_catalog_response(view_method):
+    """
+    Cache the data of a successful GET response for a viewset method and
+    answer If-None-Match with 304 while the catalog is unchanged
+    """
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return view_method(self, request, *args, **kwargs)
+
+        digest = make_cache_key(request, get_catalog_version())
+        etag = f'"{digest}"'
+
+        if etag_matches(request, etag):
+            record("not_modified")
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        key = f"catalog:response:{digest}"
+        data = cache.get(key)
+        if data is None:
+            record("misses")
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            cache.set(key, response.data, settings.CATALOG_CACHE_TIMEOUT)
+        else:
+            record("hits")
+            response = Response(data)
+
+        response["ETag"] = etag
+        return response
+
+    return wrapper
@@ -0,0 +1,244 @@
+"""
+Filtering and faceting products by parameter values.
+
+?param.<name>=<value> keeps products whose parameter has that value;
+repeating the same parameter matches any of the values. Facet counts for
+whole categories come from the ParameterFacet table, refreshed for the
+categories an import or a product or parameter edit changed; any other
+filter falls back to counting the matching products.
+Active products per category are kept on Category itself for the
+categories summary.
+"""
+
+from itertools import groupby, islice
+
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Category, ParameterFacet, Product, ProductParameter
+
+PARAM_PREFIX = "param."
+# Facet rows counted and inserted at a time by refresh_facets
+FACET_BATCH_SIZE = 5000
+
+# Query params that leave the product set unchanged
+NON_FILTER_PARAMS = {
+    "ordering",
+    "page",
+    "pagination",
+    "cursor",
+    "format",
+    "facet_limit",
+    "fields",
+    "expand",
+}
+
+
+def get_parameter_filters(query_params):
+    """{parameter name: [values]} from param.<name>=<value> query params"""
+    return {
+        key[len(PARAM_PREFIX) :]: query_params.getlist(key)
+        for key in query_params
+        if key.startswith(PARAM_PREFIX) and len(key) > len(PARAM_PREFIX)
+    }
+
+
+def filter_by_parameters(queryset, parameter_filters):
+    """Keep products matching every parameter filter"""
+    for name, values in parameter_filters.items():
+        queryset = queryset.filter(
+            pk__in=ProductParameter.objects.filter(
+                parameter__name=name, value__in=values
+            ).values("product_id")
+        )
+    return queryset
+
+
+def refresh_facets(category_ids=None):
+    """
+    Recount active products per parameter value in some categories, or in
+    every category, writing the rows in batches
+    """
+    counts = ProductParameter.objects.filter(product__is_active=True)
+    facets = ParameterFacet.objects.all()
+    if category_ids is not None:
+        counts = counts.filter(product__category_id__in=category_ids)
+        facets = facets.filter(category_id__in=category_ids)
+
+    rows = (
+        ParameterFacet(
+            category_id=row["product__category_id"],
+            parameter_id=row["parameter_id"],
+            value=row["value"],
+            product_count=row["product_count"],
+        )
+        for row in counts.values("product__category_id", "parameter_id", "value")
+        .annotate(product_count=Count("id"))
+        .order_by()
+        .iterator(chunk_size=FACET_BATCH_SIZE)
+    )
+    with transaction.atomic():
+        facets.delete()
+        while batch := list(islice(rows, FACET_BATCH_SIZE)):
+            ParameterFacet.objects.bulk_create(batch)
+
+
+class PendingFacetRefresh:
+    """
+    An on_commit callback refreshing the facets of categories, given
+    directly or through their products, that collects them until it runs
+    """
+
+    def __init__(self):
+        self.category_ids = set()
+        self.product_ids = set()
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        category_ids = set(self.category_ids)
+        if self.product_ids:
+            category_ids.update(
+                Product.objects.filter(pk__in=self.product_ids).values_list(
+                    "category_id", flat=True
+                )
+            )
+        if category_ids:
+            refresh_facets(category_ids)
+
+
+def refresh_facets_on_commit(category_ids=(), product_ids=()):
+    """
+    Refresh the facets of categories, given directly or through their
+    products, once the current transaction (if any) commits. Every call in
+    a transaction adds to one refresh, so deleting a product with many
+    parameters recounts its category once.
+    """
+    connection = transaction.get_connection()
+    pending = next(
+        (
+            func
+            for _, func, _ in connection.run_on_commit
+            if isinstance(func, PendingFacetRefresh) and not func.done
+        ),
+        None,
+    )
+    if pending is not None:
+        pending.category_ids.update(category_ids)
+        pending.product_ids.update(product_ids)
+        return
+
+    pending = PendingFacetRefresh()
+    pending.category_ids.update(category_ids)
+    pending.product_ids.update(product_ids)
+    # Outside a transaction this runs the refresh right away
+    transaction.on_commit(pending)
+
+
+def active_products(category):
+    """Active products of category, which may be an OuterRef"""
+    return Product.objects.filter(category=category, is_active=True).order_by()
+
+
+def active_product_count():
+    """Subquery counting the active products of the outer category"""
+    return Subquery(
+        active_products(OuterRef("pk"))
+        .values("category")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+
+
+def refresh_category_counts(category_ids=None):
+    """Recount active products of some categories, or of every category"""
+    categories = Category.objects.all()
+    if category_ids is not None:
+        categories = categories.filter(pk__in=category_ids)
+    categories.update(active_product_count=Coalesce(active_product_count(), 0))
+
+
+def adjust_category_counts(changes):
+    """
+    Add {category id: change} to the stored active product counts, which is
+    cheaper than recounting for single product edits
+    """
+    for category_id, change in changes.items():
+        Category.objects.filter(pk=category_id).update(
+            active_product_count=F("active_product_count") + change
+        )
+
+
+def category_counts():
+    """Categories with active products and their counts, as stored"""
+    return Category.objects.filter(active_product_count__gt=0).values(
+        "id", "name", product_count=F("active_product_count")
+    )
+
+
+def live_category_counts():
+    """
+    Same as category_counts, counted from the products table. A count per
+    category over the (category, price) index of active products beats
+    joining and grouping every product.
+    """
+    return Category.objects.filter(Exists(active_products(OuterRef("pk")))).values(
+        "id", "name", product_count=active_product_count()
+    )
+
+
+def get_precomputed_category(query_params):
+    """
+    The category id (or 0 for the whole catalog) when the request only
+    filters by category, so facets can be read from ParameterFacet;
+    otherwise None
+    """
+    filters = set(query_params) - NON_FILTER_PARAMS
+    if not filters:
+        return 0
+    if filters == {"category"}:
+        try:
+            return int(query_params["category"])
+        except ValueError:
+            return None
+    return None
+
+
+def precomputed_facets(category_id):
+    """Facet counts for a category (or every category) from ParameterFacet"""
+    facets = ParameterFacet.objects.all()
+    if category_id:
+        facets = facets.filter(category_id=category_id)
+    return (
+        facets.values("parameter__name", "value")
+        .annotate(count=Sum("product_count"))
+        .order_by()
+    )
+
+
+def live_facets(queryset):
+    """Facet counts computed over the products of queryset"""
+    return (
+        ProductParameter.objects.filter(product__in=queryset.values("pk"))
+        .values("parameter__name", "value")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+
+
+def group_facets(rows, limit):
+    """Group (parameter, value, count) rows by parameter, most common values first"""
+    rows = sorted(
+        rows, key=lambda row: (row["parameter__name"], -row["count"], row["value"])
+    )
+    return [
+        {
+            "name": name,
+            "values": [
+                {"value": row["value"], "count": row["count"]}
+                for row in list(values)[:limit]
+            ],
+        }
+        for name, values in groupby(rows, key=lambda row: row["parameter__name"])
+    ]
@@ -0,0 +1,128 @@
+"""
+Sparse fieldsets for catalog responses.
+
+?fields=id,name,price keeps only the listed fields of every object and
+?expand=category lists the relations rendered as nested objects. Without
+?expand every relation in the output is nested, as before; a relation that
+is not expanded is rendered as its id, or left out if it is a list. Views
+narrow their querysets to the fieldset, so columns and relations that are
+not rendered are not loaded.
+"""
+
+from rest_framework import permissions, serializers
+from rest_framework.exceptions import ValidationError
+
+FIELDS_PARAM = "fields"
+EXPAND_PARAM = "expand"
+
+
+class Fieldset:
+    """Fields to render, in output order, and the relations to nest"""
+
+    def __init__(self, fields, expand):
+        self.fields = fields
+        self.expand = expand
+
+    def __contains__(self, name):
+        return name in self.fields
+
+    def expands(self, name):
+        """Whether relation name is rendered as a nested object"""
+        return name in self.fields and name in self.expand
+
+
+def split_names(value):
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+def get_fieldset(request, field_names, relations):
+    """
+    Fieldset a request asks for, or None when it has neither parameter.
+    field_names are the readable fields in output order, relations the
+    names of the nested ones.
+    """
+    params = request.query_params
+    if FIELDS_PARAM not in params and EXPAND_PARAM not in params:
+        return None
+
+    fields = split_names(params.get(FIELDS_PARAM, ",".join(field_names)))
+    expand = split_names(params.get(EXPAND_PARAM, ",".join(relations)))
+
+    errors = {}
+    if unknown := fields.difference(field_names):
+        errors[FIELDS_PARAM] = (
+            f"Unknown fields: {', '.join(sorted(unknown))}. "
+            f"Available: {', '.join(field_names)}"
+        )
+    if unknown := expand.difference(relations):
+        errors[EXPAND_PARAM] = (
+            f"Unknown relations: {', '.join(sorted(unknown))}. "
+            f"Available: {', '.join(relations)}"
+        )
+    if errors:
+        raise ValidationError(errors)
+
+    return Fieldset(
+        tuple(name for name in field_names if name in fields), frozenset(expand)
+    )
+
+
+class SparseFieldsetMixin:
+    """
+    ModelSerializer mixin that renders only the fields of the fieldset it
+    is given. Nested serializers that are not expanded become primary keys,
+    or are dropped if they are lists.
+    """
+
+    def __init__(self, *args, fieldset=None, **kwargs):
+        self.fieldset = fieldset
+        super().__init__(*args, **kwargs)
+
+    @classmethod
+    def get_fieldset(cls, request):
+        fields = cls().fields
+        names = [name for name, field in fields.items() if not field.write_only]
+        relations = [
+            name
+            for name in names
+            if isinstance(fields[name], serializers.BaseSerializer)
+        ]
+        return get_fieldset(request, names, relations)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.fieldset is None:
+            return fields
+
+        for name, field in list(fields.items()):
+            if field.write_only:
+                continue
+            if name not in self.fieldset:
+                del fields[name]
+            elif (
+                isinstance(field, serializers.BaseSerializer)
+                and name not in self.fieldset.expand
+            ):
+                if isinstance(field, serializers.ListSerializer):
+                    del fields[name]
+                else:
+                    fields[name] = serializers.PrimaryKeyRelatedField(read_only=True)
+        return fields
+
+
+class SparseFieldsetViewMixin:
+    """
+    Passes the request's fieldset to the serializer on safe methods; the
+    serializer class must provide get_fieldset(request)
+    """
+
+    def get_fieldset(self):
+        if self.request.method not in permissions.SAFE_METHODS:
+            return None
+        if not hasattr(self, "_fieldset"):
+            self._fieldset = self.get_serializer_class().get_fieldset(self.request)
+        return self._fieldset
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault("fieldset", self.get_fieldset())
+        return super().get_serializer(*args, **kwargs)
@@ -0,0 +1,112 @@
+import json
+import platform
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from products.benchmarks.catalog import seed_catalog, time_call, time_request
+from products.benchmarks.runner import benchmark_database, get_git_commit
+from products.facets import (
+    category_counts,
+    live_category_counts,
+    refresh_category_counts,
+)
+from products.models import Category
+
+SUMMARY_URL = "/api/products/categories/categories_summary/"
+
+
+def python_category_counts():
+    """The summary as it used to be built: every category, filtered in Python"""
+    return [
+        {"id": cat.id, "name": cat.name, "product_count": cat.product_count}
+        for cat in Category.objects.annotate(product_count=Count("products"))
+        if cat.product_count > 0
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare ways of building the categories summary on a synthetic "
+        "catalog in a throwaway test database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--products", type=int, default=1000000, help="Products to create"
+        )
+        parser.add_argument(
+            "--categories", type=int, default=10000, help="Categories to create"
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Runs per measurement"
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            default="benchmark_categories_summary.json",
+            help="JSON file the results are written to",
+        )
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            self.stdout.write(
+                f"Creating {options['products']} products in "
+                f"{options['categories']} categories"
+            )
+            seed_catalog(options["products"], categories=options["categories"])
+            # Bulk inserts skip the signals that keep the counts
+            refresh_ms, _ = time_call(refresh_category_counts, repeat=1)
+
+            if list(category_counts()) != list(live_category_counts()):
+                raise CommandError("Stored category counts differ from the live ones")
+
+            variants = {
+                "python": python_category_counts,
+                "aggregate": lambda: list(live_category_counts()),
+                "denormalized": lambda: list(category_counts()),
+            }
+            results = []
+            for name, func in variants.items():
+                milliseconds, queries = time_call(func, options["repeat"])
+                results.append(
+                    {"variant": name, "milliseconds": milliseconds, "queries": queries}
+                )
+            milliseconds, queries = time_request(
+                APIClient(), SUMMARY_URL, options["repeat"]
+            )
+            results.append(
+                {
+                    "variant": "endpoint",
+                    "milliseconds": milliseconds,
+                    "queries": queries,
+                }
+            )
+            plan = category_counts().explain()
+
+        self.stdout.write(f"refresh_category_counts: {refresh_ms:.2f} ms")
+        for result in results:
+            self.stdout.write(
+                f"{result['variant']:<13} {result['milliseconds']:>9.2f} ms "
+                f"{result['queries']:>3} queries"
+            )
+        self.stdout.write(f"Denormalized plan: {plan}")
+
+        report = {
+            "commit": get_git_commit(),
+            "created_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "products": options["products"],
+            "categories": options["categories"],
+            "refresh_milliseconds": refresh_ms,
+            "plan": plan,
+            "results": results,
+        }
+        with open(options["output"], "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2, sort_keys=True, default=str)
+
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
@@ -0,0 +1,105 @@
+import json
+import platform
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from products.benchmarks.catalog import (
+    PRODUCTS_URL,
+    run_fieldset_benchmark,
+    seed_catalog,
+)
+from products.benchmarks.runner import benchmark_database, get_git_commit
+from products.models import Category, Product
+from suppliers.models import Supplier, SupplierProduct
+
+SUPPLIER_PRODUCTS_URL = "/api/suppliers/products/"
+
+
+def fieldset_urls(category_id):
+    """Full and sparse variants of every endpoint that takes ?fields="""
+    category_url = f"/api/products/categories/{category_id}/products/"
+    sparse = "fields=id,name,price,in_stock"
+    return {
+        "products full": PRODUCTS_URL,
+        "products sparse": f"{PRODUCTS_URL}?{sparse}",
+        "products category id": (f"{PRODUCTS_URL}?{sparse},category&expand="),
+        "category products full": category_url,
+        "category products sparse": f"{category_url}?{sparse}",
+        "supplier products full": SUPPLIER_PRODUCTS_URL,
+        "supplier products sparse": (
+            f"{SUPPLIER_PRODUCTS_URL}?fields=id,product,supplier_price&expand="
+        ),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare payload size and queries of full and sparse (?fields=) "
+        "catalog responses on a synthetic catalog in a throwaway test database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--products", type=int, default=10000, help="Products to create"
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Requests per measurement"
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            default="benchmark_fieldsets.json",
+            help="JSON file the results are written to",
+        )
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            seed_catalog(options["products"], parameters=True)
+            supplier = Supplier.objects.create(
+                name="Benchmark supplier", email="supplier@example.com"
+            )
+            SupplierProduct.objects.bulk_create(
+                SupplierProduct(
+                    supplier=supplier,
+                    product_id=product_id,
+                    supplier_price=price,
+                    supplier_quantity=quantity,
+                )
+                for product_id, price, quantity in Product.objects.values_list(
+                    "id", "price", "quantity"
+                )
+            )
+
+            client = APIClient()
+            client.force_authenticate(
+                get_user_model().objects.create_user(
+                    username="benchmark", email="benchmark@example.com"
+                )
+            )
+            category_id = Category.objects.values_list("id", flat=True).first()
+            results = run_fieldset_benchmark(
+                client, fieldset_urls(category_id), options["repeat"]
+            )
+
+        for result in results:
+            self.stdout.write(
+                f"{result['name']:<26} {result['bytes']:>9} bytes "
+                f"{result['milliseconds']:>9.2f} ms {result['queries']:>3} queries"
+            )
+
+        report = {
+            "commit": get_git_commit(),
+            "created_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "products": options["products"],
+            "results": results,
+        }
+        with open(options["output"], "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2, sort_keys=True, default=str)
+
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
@@ -0,0 +1,121 @@
+import json
+import platform
+import tempfile
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from products.benchmarks.feed_generator import generate_feed
+from products.benchmarks.runner import (
+    MODES,
+    benchmark_database,
+    get_git_commit,
+    run_scenario,
+)
+from products.utils.yaml_importer import DEFAULT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark YAMLImporter on synthetic feeds in a throwaway test "
+        "database and write the results to a JSON file"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--goods",
+            type=int,
+            nargs="+",
+            default=[1000, 10000],
+            help="Feed sizes to benchmark (number of goods)",
+        )
+        parser.add_argument(
+            "--categories", type=int, default=50, help="Categories per feed"
+        )
+        parser.add_argument(
+            "--parameters", type=int, default=5, help="Parameters per good"
+        )
+        parser.add_argument(
+            "--modes",
+            nargs="+",
+            choices=list(MODES),
+            default=["row", "bulk", "stream"],
+            help="Importer modes to benchmark",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Number of goods per bulk write",
+        )
+        parser.add_argument(
+            "--feeds-dir",
+            type=str,
+            default=str(Path(tempfile.gettempdir()) / "import_benchmark_feeds"),
+            help="Where generated feeds are kept and reused between runs",
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            default="benchmark_results.json",
+            help="JSON file the results are written to",
+        )
+
+    def handle(self, *args, **options):
+        feeds_dir = Path(options["feeds_dir"])
+        feeds_dir.mkdir(parents=True, exist_ok=True)
+
+        # Forked runs need a file database, not SQLite's in-memory default
+        with benchmark_database(feeds_dir / "benchmark.sqlite3"):
+            results = self.run_benchmarks(feeds_dir, options)
+
+        report = {
+            "commit": get_git_commit(),
+            "created_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "batch_size": options["batch_size"],
+            "results": results,
+        }
+        with open(options["output"], "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2, sort_keys=True, default=str)
+
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def run_benchmarks(self, feeds_dir, options):
+        """Generate (or reuse) every feed and import it in every mode"""
+        results = []
+        for goods in options["goods"]:
+            feed_path = feeds_dir / (
+                f"feed_{goods}_{options['categories']}_{options['parameters']}.yaml"
+            )
+            if not feed_path.exists():
+                self.stdout.write(f"Generating {feed_path}")
+                generate_feed(
+                    feed_path, goods, options["categories"], options["parameters"]
+                )
+
+            for mode in options["modes"]:
+                for result in run_scenario(str(feed_path), mode, options["batch_size"]):
+                    result.update(
+                        {
+                            "goods": goods,
+                            "categories": options["categories"],
+                            "parameters": options["parameters"],
+                            "mode": mode,
+                            "goods_per_second": round(
+                                goods / result["seconds"] if result["seconds"] else 0
+                            ),
+                        }
+                    )
+                    results.append(result)
+                    self.stdout.write(
+                        f"{goods:>8} goods  {mode:<11} {result['phase']:<8} "
+                        f"{result['seconds']:>9.2f}s "
+                        f"{result['goods_per_second']:>8} goods/s "
+                        f"{result['queries']:>8} queries "
+                        f"{result['peak_rss_mb']:>8.1f} MB"
+                    )
+        return results
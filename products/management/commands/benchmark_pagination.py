@@ -0,0 +1,73 @@
+import json
+import platform
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from products.benchmarks.catalog import run_pagination_benchmark, seed_catalog
+from products.benchmarks.runner import benchmark_database, get_git_commit
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare page-number and keyset pagination of the product list on a "
+        "synthetic catalog in a throwaway test database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--products", type=int, default=100000, help="Products to create"
+        )
+        parser.add_argument(
+            "--pages",
+            type=int,
+            nargs="+",
+            default=[1, 10, 100, 1000],
+            help="Page numbers to request",
+        )
+        parser.add_argument(
+            "--orderings",
+            nargs="+",
+            default=["-created_at", "price", "name"],
+            help="Values of the ordering query parameter",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Requests per measurement"
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            default="benchmark_pagination.json",
+            help="JSON file the results are written to",
+        )
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            self.stdout.write(f"Creating {options['products']} products")
+            seed_catalog(options["products"])
+            results = run_pagination_benchmark(
+                options["orderings"], options["pages"], options["repeat"]
+            )
+
+        for result in results:
+            self.stdout.write(
+                f"{result['ordering']:<12} page {result['page']:>6}  "
+                f"{result['pagination']:<7} {result['milliseconds']:>9.2f} ms "
+                f"{result['queries']:>3} queries"
+            )
+
+        report = {
+            "commit": get_git_commit(),
+            "created_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "products": options["products"],
+            "page_size": settings.REST_FRAMEWORK["PAGE_SIZE"],
+            "results": results,
+        }
+        with open(options["output"], "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2, sort_keys=True, default=str)
+
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
@@ -0,0 +1,102 @@
+import json
+import platform
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from products.benchmarks.catalog import run_search_benchmark, seed_catalog
+from products.benchmarks.runner import benchmark_database, get_git_commit
+from products.search import InMemorySearchBackend, get_search_backend
+from products.utils.memory import get_peak_rss_mb
+
+# Backends compared, as PRODUCT_SEARCH_BACKEND values
+BACKENDS = {
+    "substring": "products.search.SearchBackend",
+    "fulltext": "",
+    "memory": "products.search.InMemorySearchBackend",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare product search backends on a synthetic catalog in a "
+        "throwaway test database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--products", type=int, default=100000, help="Products to create"
+        )
+        parser.add_argument(
+            "--queries",
+            nargs="+",
+            default=["Bosch Pro7", "смартфон samsung", "Lite99", "красный"],
+            help="Search queries to time",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Requests per measurement"
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            default="benchmark_search.json",
+            help="JSON file the results are written to",
+        )
+
+    def handle(self, *args, **options):
+        backend_setting = settings.PRODUCT_SEARCH_BACKEND
+        with benchmark_database():
+            try:
+                self.stdout.write(f"Creating {options['products']} products")
+                seed_catalog(options["products"], parameters=True)
+
+                settings.PRODUCT_SEARCH_BACKEND = ""
+                get_search_backend().rebuild()
+
+                rss_before = get_peak_rss_mb()
+                start = time.perf_counter()
+                InMemorySearchBackend().rebuild()
+                index = {
+                    "build_seconds": round(time.perf_counter() - start, 2),
+                    "peak_rss_growth_mb": round(
+                        (get_peak_rss_mb() or 0) - (rss_before or 0), 1
+                    ),
+                    **InMemorySearchBackend().memory_usage(),
+                }
+
+                results = run_search_benchmark(
+                    BACKENDS, options["queries"], options["repeat"]
+                )
+            finally:
+                settings.PRODUCT_SEARCH_BACKEND = backend_setting
+                InMemorySearchBackend.index = InMemorySearchBackend.version = None
+
+        self.stdout.write(
+            f"In-memory index: {index['documents']} products, {index['tokens']} "
+            f"tokens, {index['postings']} postings, "
+            f"{index['bytes'] / 1024 / 1024:.1f} MB counted, peak RSS "
+            f"+{index['peak_rss_growth_mb']} MB, built in {index['build_seconds']}s"
+        )
+        for result in results:
+            self.stdout.write(
+                f"{result['backend']:<10} {result['query']:<20} "
+                f"{result['count']:>8} hits {result['milliseconds']:>9.2f} ms "
+                f"{result['queries']:>3} queries"
+            )
+
+        report = {
+            "commit": get_git_commit(),
+            "created_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "products": options["products"],
+            "memory_index": index,
+            "results": results,
+        }
+        with open(options["output"], "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2, sort_keys=True, default=str)
+
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
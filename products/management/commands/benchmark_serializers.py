@@ -0,0 +1,78 @@
+import json
+import platform
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from products.benchmarks.catalog import seed_catalog
+from products.benchmarks.runner import benchmark_database, get_git_commit
+from products.benchmarks.serialization import (
+    find_differences,
+    load_products,
+    run_serializer_benchmark,
+    serializer_context,
+)
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Check that ProductReadSerializer renders exactly what "
+        "ProductSerializer does, then time both on a synthetic catalog in a "
+        "throwaway test database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--products", type=int, default=1000, help="Products to serialize"
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=20, help="Runs per measurement"
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            default="benchmark_serializers.json",
+            help="JSON file the results are written to",
+        )
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            # Extra products make up for the inactive ones seed_catalog creates
+            seed_catalog(options["products"] * 2, parameters=True)
+            # Cover both branches of the image field
+            Product.objects.filter(
+                pk__in=Product.objects.values_list("pk", flat=True)[::3]
+            ).update(image="products/benchmark.jpg")
+            products = load_products(options["products"])
+
+            differences = find_differences(products, {}) + find_differences(
+                products, serializer_context()
+            )
+            if differences:
+                raise CommandError(
+                    "ProductReadSerializer output differs from ProductSerializer:\n"
+                    + json.dumps(differences, indent=2, ensure_ascii=False)
+                )
+
+            results = run_serializer_benchmark(products, options["repeat"])
+
+        self.stdout.write(f"Outputs identical for {len(products)} products")
+        for result in results:
+            self.stdout.write(
+                f"{result['serializer']:<6} {result['ms_per_1000']:>9.2f} ms "
+                f"per 1000 products"
+            )
+
+        report = {
+            "commit": get_git_commit(),
+            "created_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "results": results,
+        }
+        with open(options["output"], "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2, sort_keys=True, default=str)
+
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
@@ -0,0 +1,169 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import yaml
+from django.core.management.base import BaseCommand
+
+from products.utils.feed_loader import EXTENSIONS as FEED_EXTENSIONS
+from products.utils.parallel_import import init_worker, parse_feed
+from products.utils.yaml_importer import DEFAULT_BATCH_SIZE, YAMLImporter
+
+
+class Command(BaseCommand):
+    help = (
+        "Import many supplier feeds: parse them in a process pool and "
+        "write them through a single importer"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "source",
+            type=str,
+            help=(
+                "Directory of feed files (supplier = file name) or a YAML "
+                "manifest listing {file, supplier} entries"
+            ),
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Number of parser processes",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Number of goods per bulk write",
+        )
+        parser.add_argument(
+            "--verbose", action="store_true", help="Verbose output for debugging"
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help=(
+                "Only write goods whose content changed since the supplier's "
+                "previous import and mark goods missing from the feed unavailable"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        source = Path(options["source"])
+        if not source.exists():
+            self.stdout.write(self.style.ERROR(f"{source} does not exist"))
+            sys.exit(1)
+
+        feeds = self.collect_feeds(source)
+        if not feeds:
+            self.stdout.write(self.style.WARNING(f"No feeds found in {source}"))
+            return
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Importing {len(feeds)} feeds with {options['workers']} workers"
+            )
+        )
+
+        results = []
+        failed = 0
+        start = time.perf_counter()
+
+        with ProcessPoolExecutor(
+            max_workers=options["workers"], initializer=init_worker
+        ) as pool:
+            futures = {
+                pool.submit(parse_feed, str(file_path), supplier): (file_path, supplier)
+                for file_path, supplier in feeds
+            }
+
+            # Feeds are written one at a time, in the order they finish parsing
+            for future in as_completed(futures):
+                file_path, supplier = futures[future]
+                try:
+                    feed = future.result()
+                    results.append(self.write_feed(feed, options))
+                except Exception as e:
+                    failed += 1
+                    self.stdout.write(
+                        self.style.ERROR(f"Failed to import {file_path}: {e}")
+                    )
+
+        self.print_summary(results, time.perf_counter() - start)
+
+        if failed:
+            self.stdout.write(self.style.ERROR(f"{failed} feeds failed"))
+            sys.exit(1)
+
+    def collect_feeds(self, source):
+        """Return (file, supplier) pairs from a directory or a manifest"""
+        if source.is_dir():
+            return [
+                (file_path, file_path.stem)
+                for file_path in sorted(source.iterdir())
+                if file_path.suffix.lower() in FEED_EXTENSIONS
+            ]
+
+        with open(source, "r", encoding="utf-8") as file:
+            manifest = yaml.safe_load(file) or []
+
+        feeds = []
+        for entry in manifest:
+            file_path = Path(entry["file"])
+            if not file_path.is_absolute():
+                file_path = source.parent / file_path
+            feeds.append((file_path, entry["supplier"]))
+        return feeds
+
+    def write_feed(self, feed, options):
+        """Write one parsed feed and report its timings"""
+        start = time.perf_counter()
+        importer = YAMLImporter(
+            verbose=options["verbose"],
+            batch_size=options["batch_size"],
+            incremental=options["incremental"],
+        )
+        stats = importer.import_normalized(feed["shops"], feed["supplier"])
+        stats["errors"] += feed["errors"]
+        write_seconds = time.perf_counter() - start
+
+        self.stdout.write(
+            f"{feed['file']} ({feed['supplier']}): {feed['goods']} goods, "
+            f"parsed in {feed['parse_seconds']:.2f}s, "
+            f"written in {write_seconds:.2f}s, "
+            f"{stats['products_created']} created, "
+            f"{stats['products_updated']} updated, "
+            f"{stats['goods_unchanged']} unchanged, "
+            f"{stats['goods_removed']} removed, "
+            f"{stats['errors']} errors"
+        )
+
+        return {
+            "goods": feed["goods"],
+            "parse_seconds": feed["parse_seconds"],
+            "write_seconds": write_seconds,
+        }
+
+    def print_summary(self, results, elapsed):
+        """Print aggregate throughput"""
+        goods = sum(result["goods"] for result in results)
+        parse_seconds = sum(result["parse_seconds"] for result in results)
+        write_seconds = sum(result["write_seconds"] for result in results)
+
+        self.stdout.write(self.style.SUCCESS("\n" + "=" * 50))
+        self.stdout.write(self.style.SUCCESS("IMPORT SUMMARY:"))
+        self.stdout.write(self.style.SUCCESS(f"Feeds imported: {len(results)}"))
+        self.stdout.write(self.style.SUCCESS(f"Goods processed: {goods}"))
+        self.stdout.write(
+            self.style.SUCCESS(f"Parse time (sum over workers): {parse_seconds:.2f}s")
+        )
+        self.stdout.write(self.style.SUCCESS(f"Write time: {write_seconds:.2f}s"))
+        self.stdout.write(self.style.SUCCESS(f"Wall time: {elapsed:.2f}s"))
+        if elapsed > 0:
+            self.stdout.write(
+                self.style.SUCCESS(f"Throughput: {goods / elapsed:.0f} goods/s")
+            )
+        self.stdout.write(self.style.SUCCESS("=" * 50))
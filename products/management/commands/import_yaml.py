@@ -3,7 +3,8 @@ import sys
 
 from django.core.management.base import BaseCommand
 
-from products.utils.yaml_importer import YAMLImporter
+from products.utils.memory import get_peak_rss_mb
+from products.utils.yaml_importer import DEFAULT_BATCH_SIZE, YAMLImporter
 
 
 class Command(BaseCommand):
@@ -11,7 +12,9 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument(
-            "yaml_file", type=str, help="Path to the YAML file to import"
+            "yaml_file",
+            type=str,
+            help="Path to the YAML, JSON or JSON Lines feed to import",
         )
         parser.add_argument(
             "--supplier",
@@ -22,6 +25,30 @@ class Command(BaseCommand):
         parser.add_argument(
             "--verbose", action="store_true", help="Verbose output for debugging"
         )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help=(
+                "Only write goods whose content changed since the supplier's "
+                "previous import and mark goods missing from the feed unavailable"
+            ),
+        )
+        parser.add_argument(
+            "--bulk",
+            action="store_true",
+            help="Write products in chunks with bulk inserts and upserts",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Number of goods per chunk in bulk mode",
+        )
+        parser.add_argument(
+            "--stream",
+            action="store_true",
+            help="Read goods one at a time instead of loading the whole file",
+        )
 
     def handle(self, *args, **options):
         yaml_file = options["yaml_file"]
@@ -39,8 +66,15 @@ class Command(BaseCommand):
         )
 
         try:
-            importer = YAMLImporter(verbose=verbose)
-            stats = importer.import_from_file(yaml_file, supplier_name)
+            importer = YAMLImporter(
+                verbose=verbose,
+                bulk=options["bulk"],
+                batch_size=options["batch_size"],
+                incremental=options["incremental"],
+            )
+            stats = importer.import_from_file(
+                yaml_file, supplier_name, stream=options["stream"]
+            )
 
             # Print summary
             self.print_summary(stats)
@@ -76,6 +110,33 @@ class Command(BaseCommand):
             )
         )
 
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Goods unchanged/changed/removed: {stats["goods_unchanged"]}'
+                f'/{stats["goods_changed"]}/{stats["goods_removed"]}'
+            )
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Parameters created: {stats["parameters_created"]}')
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Product parameters written: {stats["product_parameters_written"]}'
+            )
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Category cache hits/misses: {stats["category_cache_hits"]}'
+                f'/{stats["category_cache_misses"]}'
+            )
+        )
+
+        peak_rss = get_peak_rss_mb()
+        if peak_rss is not None:
+            self.stdout.write(
+                self.style.SUCCESS(f"Peak memory (RSS): {peak_rss:.1f} MB")
+            )
+
         if stats["errors"] > 0:
             self.stdout.write(
                 self.style.WARNING(f'Errors encountered: {stats["errors"]}')
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from products.facets import refresh_category_counts, refresh_facets
+from products.models import ParameterFacet
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the precomputed parameter facets and the active products of "
+        "every category"
+    )
+
+    def handle(self, *args, **options):
+        refresh_category_counts()
+        refresh_facets()
+        self.stdout.write(
+            self.style.SUCCESS(f"{ParameterFacet.objects.count()} facet rows written")
+        )
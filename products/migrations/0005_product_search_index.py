@@ -0,0 +1,46 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+FTS_TABLE = "products_product_fts"
+
+# Must match products.search.product_search_vector()
+SEARCH_INDEX = GinIndex(
+    SearchVector("name", weight="A", config="russian")
+    + SearchVector("description", weight="B", config="russian"),
+    name="product_search_gin_idx",
+)
+
+
+def create_search_index(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.add_index(Product, SEARCH_INDEX)
+    elif schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            f"name, description, tokenize='unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, name, description) "
+            f"SELECT id, name, description FROM {Product._meta.db_table}"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.remove_index(Product, SEARCH_INDEX)
+    elif schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0004_product_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
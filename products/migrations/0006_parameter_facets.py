@@ -0,0 +1,67 @@
+# Generated by Django 4.2.7 on 2026-10-17 09:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0005_product_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ParameterFacet",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("value", models.CharField(max_length=255, verbose_name="Value")),
+                (
+                    "product_count",
+                    models.PositiveIntegerField(verbose_name="Product count"),
+                ),
+            ],
+            options={
+                "verbose_name": "Parameter facet",
+                "verbose_name_plural": "Parameter facets",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="productparameter",
+            index=models.Index(
+                fields=["parameter", "value", "product"], name="productparam_value_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="parameterfacet",
+            name="category",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="parameter_facets",
+                to="products.category",
+                verbose_name="Category",
+            ),
+        ),
+        migrations.AddField(
+            model_name="parameterfacet",
+            name="parameter",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="facets",
+                to="products.parameter",
+                verbose_name="Parameter",
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="parameterfacet",
+            unique_together={("category", "parameter", "value")},
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-17 09:31
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_active_products(apps, schema_editor):
+    Category = apps.get_model("products", "Category")
+    Product = apps.get_model("products", "Product")
+    active = (
+        Product.objects.filter(category=OuterRef("pk"), is_active=True)
+        .order_by()
+        .values("category")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    Category.objects.update(active_product_count=Coalesce(Subquery(active), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0006_parameter_facets"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="active_product_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Active products"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="category",
+            index=models.Index(
+                condition=models.Q(("active_product_count__gt", 0)),
+                fields=["name", "id", "active_product_count"],
+                name="category_summary_idx",
+            ),
+        ),
+        migrations.RunPython(count_active_products, migrations.RunPython.noop),
+    ]
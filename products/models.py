@@ -1,6 +1,10 @@
+from collections import Counter
+
 from django.conf import settings
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
 
 
 class Category(models.Model):
@@ -8,16 +12,62 @@ class Category(models.Model):
 
     name = models.CharField(max_length=100, unique=True, verbose_name="Category name")
     description = models.TextField(blank=True, verbose_name="Description")
+    # Adjusted by the Product signals below and recounted by imports, see
+    # products.facets.refresh_category_counts
+    active_product_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Active products"
+    )
 
     class Meta:
         verbose_name = "Category"
         verbose_name_plural = "Categories"
         ordering = ["name"]
+        indexes = [
+            # Covers the categories summary, which skips empty categories
+            models.Index(
+                fields=["name", "id", "active_product_count"],
+                condition=models.Q(active_product_count__gt=0),
+                name="category_summary_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class ProductQuerySet(models.QuerySet):
+    # Columns behind the serialized fields that are not columns themselves
+    FIELD_COLUMNS = {"in_stock": ["quantity"], "parameters": []}
+
+    def with_details(self):
+        """Load the category and parameters that ProductSerializer nests"""
+        return self.select_related("category").with_parameters()
+
+    def with_parameters(self):
+        return self.prefetch_related(
+            models.Prefetch(
+                "parameters",
+                queryset=ProductParameter.objects.select_related("parameter"),
+            )
+        )
+
+    def for_fieldset(self, fieldset, keep=()):
+        """
+        Load only the columns and relations a sparse fieldset renders (see
+        products.fieldsets), plus the keep columns
+        """
+        queryset = self.select_related(None).prefetch_related(None)
+        columns = {"id", *keep}
+        for name in fieldset.fields:
+            columns.update(self.FIELD_COLUMNS.get(name, [name]))
+
+        if fieldset.expands("category"):
+            queryset = queryset.select_related("category")
+        if fieldset.expands("parameters"):
+            queryset = queryset.with_parameters()
+        return queryset.only(*columns)
+
+
 class Product(models.Model):
     """Product model"""
 
@@ -43,10 +93,52 @@ class Product(models.Model):
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Updated at")
     is_active = models.BooleanField(default=True, verbose_name="Is active")
 
+    objects = ProductQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Product"
         verbose_name_plural = "Products"
         ordering = ["-created_at"]
+        # Every catalog query filters on is_active and pages by one of the
+        # orderings with id as a tiebreaker (see products.pagination). The
+        # indexes are partial so that inactive products are left out and
+        # SQLite can match Django's bare "WHERE is_active" condition.
+        indexes = [
+            models.Index(
+                fields=["created_at", "id"],
+                condition=models.Q(is_active=True),
+                name="product_active_created_idx",
+            ),
+            models.Index(
+                fields=["price", "id"],
+                condition=models.Q(is_active=True),
+                name="product_active_price_idx",
+            ),
+            models.Index(
+                fields=["name", "id"],
+                condition=models.Q(is_active=True),
+                name="product_active_name_idx",
+            ),
+            models.Index(
+                fields=["quantity", "id"],
+                condition=models.Q(is_active=True),
+                name="product_active_qty_idx",
+            ),
+            models.Index(
+                fields=["category", "price"],
+                condition=models.Q(is_active=True),
+                name="product_active_cat_price_idx",
+            ),
+            # ?in_stock=true on the default ordering
+            models.Index(
+                fields=["created_at", "id"],
+                condition=models.Q(is_active=True, quantity__gt=0),
+                name="product_in_stock_created_idx",
+            ),
+            # Search indexes catching up on products changed elsewhere,
+            # inactive ones included
+            models.Index(fields=["updated_at"], name="product_updated_idx"),
+        ]
 
     def __str__(self):
         return f"{self.name} - ${self.price}"
@@ -88,6 +180,193 @@ class ProductParameter(models.Model):
         verbose_name = "Product parameter"
         verbose_name_plural = "Product parameters"
         unique_together = ("product", "parameter")
+        indexes = [
+            # ?param.<name>=<value> filters
+            models.Index(
+                fields=["parameter", "value", "product"],
+                name="productparam_value_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.product.name}: {self.parameter.name} = {self.value}"
+
+
+class ParameterFacet(models.Model):
+    """
+    Precomputed number of active products per category and parameter value,
+    refreshed for the categories imports and edits change (see
+    products.facets)
+    """
+
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        related_name="parameter_facets",
+        verbose_name="Category",
+    )
+    parameter = models.ForeignKey(
+        Parameter,
+        on_delete=models.CASCADE,
+        related_name="facets",
+        verbose_name="Parameter",
+    )
+    value = models.CharField(max_length=255, verbose_name="Value")
+    product_count = models.PositiveIntegerField(verbose_name="Product count")
+
+    class Meta:
+        verbose_name = "Parameter facet"
+        verbose_name_plural = "Parameter facets"
+        unique_together = ("category", "parameter", "value")
+
+    def __str__(self):
+        return f"{self.category.name}: {self.parameter.name} = {self.value}"
+
+
+class ImportJob(models.Model):
+    """YAML import queued from the API and run by a Celery worker"""
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        RUNNING = "RUNNING", "Running"
+        SUCCESS = "SUCCESS", "Success"
+        FAILED = "FAILED", "Failed"
+
+    file = models.FileField(upload_to="imports/", verbose_name="Feed file")
+    supplier_name = models.CharField(max_length=200, verbose_name="Supplier name")
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING,
+        verbose_name="Status",
+    )
+    stats = models.JSONField(default=dict, blank=True, verbose_name="Import stats")
+    error = models.TextField(blank=True, verbose_name="Error")
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="import_jobs",
+        verbose_name="Created by",
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Created at")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Started at")
+    finished_at = models.DateTimeField(
+        null=True, blank=True, verbose_name="Finished at"
+    )
+
+    class Meta:
+        verbose_name = "Import job"
+        verbose_name_plural = "Import jobs"
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"Import #{self.pk} ({self.supplier_name}) - {self.status}"
+
+    @property
+    def progress_cache_key(self):
+        return f"import-job-progress:{self.pk}"
+
+
+# Keep the full-text search index in step with product edits
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, **kwargs):
+    from .search import get_search_backend
+
+    get_search_backend().index_products([instance])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    from .search import get_search_backend
+
+    get_search_backend().remove_products([instance.pk])
+
+
+@receiver(post_save, sender=ProductParameter)
+@receiver(post_delete, sender=ProductParameter)
+def index_product_parameters(sender, instance, **kwargs):
+    from .search import get_search_backend
+
+    get_search_backend().index_parameters([instance.product_id])
+
+
+# Keep Category.active_product_count and the parameter facets in step with
+# product and parameter edits
+def changes_category_counts(update_fields):
+    return update_fields is None or not {"category", "is_active"}.isdisjoint(
+        update_fields
+    )
+
+
+@receiver(pre_save, sender=Product)
+def remember_product_category(sender, instance, update_fields=None, **kwargs):
+    instance._previous_category = None
+    if not instance._state.adding and changes_category_counts(update_fields):
+        instance._previous_category = (
+            Product.objects.filter(pk=instance.pk)
+            .values_list("category_id", "is_active")
+            .first()
+        )
+
+
+def category_count_changes(instance, created):
+    """
+    {category id: change} to active product counts made by a save of
+    instance: none unless it was created or its category or is_active changed
+    """
+    previous = None
+    if not created:
+        previous = getattr(instance, "_previous_category", None)
+        if previous is None or previous == (instance.category_id, instance.is_active):
+            return {}
+
+    changes = Counter()
+    if previous is not None and previous[1]:
+        changes[previous[0]] -= 1
+    if instance.is_active:
+        changes[instance.category_id] += 1
+    return {category_id: change for category_id, change in changes.items() if change}
+
+
+@receiver(post_save, sender=Product)
+def count_product(sender, instance, created, **kwargs):
+    from .facets import adjust_category_counts, refresh_facets_on_commit
+
+    changes = category_count_changes(instance, created)
+    if changes:
+        adjust_category_counts(changes)
+        # A new product has no parameters yet
+        if not created:
+            refresh_facets_on_commit(list(changes))
+
+
+@receiver(post_delete, sender=Product)
+def uncount_product(sender, instance, **kwargs):
+    from .facets import adjust_category_counts, refresh_facets_on_commit
+
+    if instance.is_active:
+        adjust_category_counts({instance.category_id: -1})
+    refresh_facets_on_commit([instance.category_id])
+
+
+@receiver(post_save, sender=ProductParameter)
+@receiver(post_delete, sender=ProductParameter)
+def count_product_parameter(sender, instance, **kwargs):
+    from .facets import refresh_facets_on_commit
+
+    refresh_facets_on_commit(product_ids=[instance.product_id])
+
+
+# Invalidate cached catalog responses once catalog writes commit
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=ProductParameter)
+@receiver(post_delete, sender=ProductParameter)
+def invalidate_catalog_cache(sender, **kwargs):
+    from .cache import bump_catalog_version_on_commit
+
+    bump_catalog_version_on_commit()
@@ -0,0 +1,207 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset pagination: every page continues after the last row of the
+    previous one, so deep pages need neither COUNT(*) nor a large OFFSET.
+    Rows are ordered by the first ordering field with id as a tiebreaker,
+    and a cursor only continues the ordering it was made for.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.field, self.descending = self.get_ordering(queryset)
+        cursor = self.decode_cursor(request, queryset)
+        reverse = bool(cursor and cursor["r"])
+
+        rows = list(self.get_page_queryset(queryset, cursor))
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_ordering(self, queryset):
+        """Return the field rows are ordered by and whether it is descending"""
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        term = ordering[0] if ordering else "pk"
+        descending = term.startswith("-")
+        field = term.lstrip("-")
+        if field == queryset.model._meta.pk.name:
+            field = "pk"
+        return field, descending
+
+    @property
+    def ordering(self):
+        """Ordering term a cursor belongs to, such as -price"""
+        return f"{'-' if self.descending else ''}{self.field}"
+
+    def get_page_queryset(self, queryset, cursor=None):
+        """One page plus a row that tells whether another page follows"""
+        descending = self.descending != bool(cursor and cursor["r"])
+        prefix = "-" if descending else ""
+        if self.field == "pk":
+            queryset = queryset.order_by(f"{prefix}pk")
+        else:
+            queryset = queryset.order_by(f"{prefix}{self.field}", f"{prefix}pk")
+        if cursor:
+            queryset = queryset.filter(
+                self.get_seek_filter(cursor["v"], cursor["pk"], descending)
+            )
+        return queryset[: self.page_size + 1]
+
+    def get_seek_filter(self, value, pk, descending):
+        """Rows after (value, pk) in the current direction"""
+        lookup = "lt" if descending else "gt"
+        if self.field == "pk":
+            return Q(**{f"pk__{lookup}": pk})
+
+        # The redundant inclusive bound lets the database seek an index
+        # instead of evaluating the OR for every row
+        return Q(**{f"{self.field}__{lookup}e": value}) & (
+            Q(**{f"{self.field}__{lookup}": value})
+            | Q(**{self.field: value, f"pk__{lookup}": pk})
+        )
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(
+                self.request.build_absolute_uri(), self.cursor_query_param
+            )
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def decode_cursor(self, request, queryset):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+            if not {"o", "v", "pk", "r"} <= set(cursor):
+                raise ValueError
+            # A cursor of another ordering or search points nowhere sensible
+            if cursor["o"] != self.ordering:
+                raise ValueError
+            cursor["v"], cursor["pk"] = self.parse_position(
+                queryset, cursor["v"], cursor["pk"]
+            )
+        except (
+            TypeError,
+            ValueError,
+            UnicodeEncodeError,
+            binascii.Error,
+            ValidationError,
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def parse_position(self, queryset, value, pk):
+        """Convert the JSON values of a cursor to those of the ordering columns"""
+        opts = queryset.model._meta
+        pk = opts.pk.to_python(pk)
+        if pk is None:
+            raise ValueError
+        if self.field == "pk":
+            return None, pk
+
+        if self.field in queryset.query.annotations:
+            field = queryset.query.annotations[self.field].output_field
+        else:
+            field = opts.get_field(self.field)
+        value = field.to_python(value)
+        # The ordering columns are not nullable, and None cannot be compared
+        if value is None:
+            raise ValueError
+        return value, pk
+
+    def encode_cursor(self, row, reverse):
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.make_cursor(row, reverse),
+        )
+
+    def make_cursor(self, row, reverse=False):
+        """Opaque cursor token pointing just past row"""
+        value = None if self.field == "pk" else getattr(row, self.field)
+        if isinstance(value, (date, datetime)):
+            value = value.isoformat()
+        elif isinstance(value, Decimal):
+            value = str(value)
+
+        cursor = json.dumps(
+            {"o": self.ordering, "v": value, "pk": row.pk, "r": reverse}
+        )
+        return base64.urlsafe_b64encode(cursor.encode("utf-8")).decode("ascii")
+
+
+class CatalogPagination(PageNumberPagination):
+    """
+    Page numbers by default; ?pagination=cursor (or a cursor from a
+    previous response) switches the request to keyset pagination
+    """
+
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if (
+            request.query_params.get("pagination") == "cursor"
+            or KeysetPagination.cursor_query_param in request.query_params
+        ):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,332 @@
+"""
+Full-text product search.
+
+The backend is picked from the database vendor (or PRODUCT_SEARCH_BACKEND):
+
+* PostgreSQL - a weighted SearchVector over name and description backed by
+  a GIN expression index, ranked with SearchRank
+* SQLite - an FTS5 table keyed by product id, ranked with bm25() and kept
+  in sync by Product signals and by the YAML importer's bulk writes
+* InMemorySearchBackend (opt-in) - a process-local inverted index that also
+  covers parameter values and resolves a search to product ids in Python,
+  kept in sync by the same signals and catching up on writes of other
+  processes whenever the catalog version changes
+* anything else - case-insensitive substring matching like SearchFilter
+"""
+
+import json
+import re
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection, transaction
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+from .cache import get_catalog_version
+from .models import Product, ProductParameter
+from .utils.inverted_index import InvertedIndex
+
+# Text search configuration for PostgreSQL; most product names are Russian
+SEARCH_CONFIG = "russian"
+
+FTS_TABLE = "products_product_fts"
+
+# Products are stamped before their transaction commits, so catching up
+# also re-reads products stamped shortly before the previous catch-up
+CATCH_UP_OVERLAP = timedelta(minutes=1)
+
+
+def product_search_vector():
+    """
+    The tsvector searched on PostgreSQL. Migration 0005 indexes this exact
+    expression, so both must change together.
+    """
+    return SearchVector("name", weight="A", config=SEARCH_CONFIG) + SearchVector(
+        "description", weight="B", config=SEARCH_CONFIG
+    )
+
+
+class SearchBackend:
+    """Substring search on name and description, without ranking"""
+
+    def search(self, queryset, query):
+        """Filter queryset to products matching query"""
+        condition = Q()
+        for term in query.split():
+            condition &= Q(name__icontains=term) | Q(description__icontains=term)
+        return queryset.filter(condition)
+
+    def index_products(self, products):
+        """Add or refresh products in the search index"""
+
+    def index_parameters(self, product_ids):
+        """Refresh products whose parameters changed"""
+
+    def remove_products(self, product_ids):
+        """Drop products from the search index"""
+
+    def rebuild(self):
+        """Rebuild the search index from the products table"""
+
+
+class PostgresSearchBackend(SearchBackend):
+    """tsvector search; the GIN expression index updates itself"""
+
+    def search(self, queryset, query):
+        search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type="websearch")
+        vector = product_search_vector()
+        return queryset.annotate(
+            search_vector=vector, search_rank=SearchRank(vector, search_query)
+        ).filter(search_vector=search_query)
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """FTS5 search over a shadow table whose rowid is the product id"""
+
+    # bm25() column weights: a name match counts ten times a description match
+    rank_expression = f"-bm25({FTS_TABLE}, 10.0, 1.0)"
+
+    def match_expression(self, query):
+        """Every word must match, as a prefix so that partial words work"""
+        return " ".join(f'"{term}"*' for term in re.findall(r"\w+", query))
+
+    def search(self, queryset, query):
+        match = self.match_expression(query)
+        if not match:
+            return queryset.none()
+
+        # Join the FTS table rather than ranking in a correlated subquery,
+        # which would run the MATCH again for every matching product
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[
+                f'{FTS_TABLE}.rowid = "{Product._meta.db_table}"."id"',
+                f"{FTS_TABLE} MATCH %s",
+            ],
+            params=[match],
+        ).annotate(
+            search_rank=RawSQL(self.rank_expression, (), output_field=FloatField())
+        )
+
+    def index_products(self, products):
+        products = [product for product in products if product.pk is not None]
+        if not products:
+            return
+        self.remove_products([product.pk for product in products])
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, description) "
+                f"VALUES (%s, %s, %s)",
+                [
+                    (product.pk, product.name, product.description)
+                    for product in products
+                ],
+            )
+
+    def remove_products(self, product_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = %s",
+                [(product_id,) for product_id in product_ids],
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, description) "
+                f"SELECT id, name, description FROM {Product._meta.db_table}"
+            )
+
+
+class InMemorySearchBackend(SearchBackend):
+    """
+    Inverted index over name, description and parameter values, built on
+    the first search and kept in memory. Every process holds its own copy:
+    signals refresh it after writes made through this process, and once
+    the catalog version (see products.cache) has moved it re-reads the
+    products other processes updated since it last read the table.
+    """
+
+    index = None
+    # Catalog version the index has caught up with
+    version = None
+    # When the index last read the products table
+    synced_at = None
+    build_lock = threading.Lock()
+
+    @classmethod
+    def get_index(cls):
+        """The process-wide index, caught up when the catalog has changed"""
+        version = get_catalog_version()
+        if InMemorySearchBackend.version != version:
+            with InMemorySearchBackend.build_lock:
+                if InMemorySearchBackend.index is None:
+                    cls.build(version)
+                elif InMemorySearchBackend.version != version:
+                    cls.catch_up(version)
+        return InMemorySearchBackend.index
+
+    @classmethod
+    def build(cls, version):
+        """
+        Build the index and record the version read before the build, so
+        that writes made meanwhile move past it and are caught up with
+        """
+        synced_at = timezone.now()
+        InMemorySearchBackend.index = cls.build_index()
+        InMemorySearchBackend.version = version
+        InMemorySearchBackend.synced_at = synced_at
+
+    @classmethod
+    def catch_up(cls, version):
+        """
+        Re-index products updated since the index last read the table.
+        Products deleted by other processes stay indexed, which is harmless
+        as search() only narrows down a queryset of existing products.
+        """
+        synced_at = timezone.now()
+        changed = Product.objects.filter(
+            updated_at__gte=InMemorySearchBackend.synced_at - CATCH_UP_OVERLAP
+        )
+        index = InMemorySearchBackend.index
+        for product_id, texts in cls.read_texts(changed).items():
+            index.add(product_id, texts)
+        InMemorySearchBackend.version = version
+        InMemorySearchBackend.synced_at = synced_at
+
+    @staticmethod
+    def build_index():
+        """Index every product, merging in its parameter values by product id"""
+        index = InvertedIndex()
+        parameters = iter(
+            ProductParameter.objects.order_by("product_id")
+            .values_list("product_id", "value")
+            .iterator(chunk_size=10000)
+        )
+        parameter = next(parameters, None)
+
+        products = (
+            Product.objects.order_by("id")
+            .values_list("id", "name", "description")
+            .iterator(chunk_size=10000)
+        )
+        for product_id, name, description in products:
+            texts = [name, description]
+            while parameter is not None and parameter[0] <= product_id:
+                if parameter[0] == product_id:
+                    texts.append(parameter[1])
+                parameter = next(parameters, None)
+            index.add(product_id, texts)
+        return index
+
+    @staticmethod
+    def read_texts(products):
+        """Name, description and parameter values of a product queryset by id"""
+        texts = {
+            product_id: [name, description]
+            for product_id, name, description in products.values_list(
+                "id", "name", "description"
+            )
+        }
+        for product_id, value in ProductParameter.objects.filter(
+            product__in=products
+        ).values_list("product_id", "value"):
+            # Skip products written between the two reads
+            if product_id in texts:
+                texts[product_id].append(value)
+        return texts
+
+    def search(self, queryset, query):
+        product_ids = self.get_index().search(query)
+        if not product_ids:
+            return queryset.none()
+
+        if connection.vendor == "sqlite":
+            # A single parameter instead of one per id, which could exceed
+            # SQLite's limit on bound variables
+            return queryset.filter(
+                pk__in=RawSQL(
+                    "SELECT value FROM json_each(%s)", (json.dumps(list(product_ids)),)
+                )
+            )
+        return queryset.filter(pk__in=list(product_ids))
+
+    def refresh(self, product_ids):
+        """Re-read products and their parameters from the database"""
+        index = InMemorySearchBackend.index
+        if index is None or not product_ids:
+            return
+
+        texts = self.read_texts(Product.objects.filter(pk__in=product_ids))
+        for product_id in product_ids:
+            if product_id in texts:
+                index.add(product_id, texts[product_id])
+            else:
+                index.remove(product_id)
+
+    def index_products(self, products):
+        product_ids = {product.pk for product in products if product.pk is not None}
+        # Rolled back writes must not reach the index
+        transaction.on_commit(lambda: self.refresh(product_ids))
+
+    def index_parameters(self, product_ids):
+        product_ids = set(product_ids)
+        transaction.on_commit(lambda: self.refresh(product_ids))
+
+    def remove_products(self, product_ids):
+        product_ids = set(product_ids)
+        transaction.on_commit(lambda: self.refresh(product_ids))
+
+    def rebuild(self):
+        with InMemorySearchBackend.build_lock:
+            self.build(get_catalog_version())
+
+    def memory_usage(self):
+        """Size of the index, or None before it is built"""
+        index = InMemorySearchBackend.index
+        return index.memory_usage() if index is not None else None
+
+
+BACKENDS = {
+    "postgresql": PostgresSearchBackend,
+    "sqlite": SQLiteFTSBackend,
+}
+
+
+def get_search_backend():
+    """Search backend for the default database"""
+    if settings.PRODUCT_SEARCH_BACKEND:
+        return import_string(settings.PRODUCT_SEARCH_BACKEND)()
+    return BACKENDS.get(connection.vendor, SearchBackend)()
+
+
+class ProductSearchFilter(filters.BaseFilterBackend):
+    """
+    ?search= through the search backend. Results are ordered by relevance
+    unless the request asks for another ordering, so this filter has to
+    run after OrderingFilter.
+    """
+
+    search_param = api_settings.SEARCH_PARAM
+    ordering_param = api_settings.ORDERING_PARAM
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, "").strip()
+        if not query:
+            return queryset
+
+        queryset = get_search_backend().search(queryset, query)
+        if (
+            "search_rank" in queryset.query.annotations
+            and self.ordering_param not in request.query_params
+        ):
+            queryset = queryset.order_by("-search_rank", "-pk")
+        return queryset
@@ -1,6 +1,12 @@
+from operator import attrgetter
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.functional import cached_property
 from rest_framework import serializers
 
-from .models import Category, Product, ProductParameter
+from .fieldsets import SparseFieldsetMixin, get_fieldset
+from .models import Category, ImportJob, Product, ProductParameter
 
 
 # Serializer for product parameters (configurable characteristics)
@@ -25,7 +31,7 @@ class CategorySerializer(serializers.ModelSerializer):
 
 
 # Main Product serializer
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)  # nested read-only
     category_id = serializers.PrimaryKeyRelatedField(
         queryset=Category.objects.all(),
@@ -66,3 +72,135 @@ class ProductSerializer(serializers.ModelSerializer):
         if value < 0:
             raise serializers.ValidationError("Quantity cannot be negative")
         return value
+
+
+# Read-only fast path for product lists
+class ProductReadSerializer(serializers.BaseSerializer):
+    """
+    Builds the same JSON as ProductSerializer straight from a product loaded
+    with_details() (or for_fieldset()), skipping DRF's per-field
+    get_attribute and bound field machinery. Output must stay identical to
+    ProductSerializer, which ProductReadSerializerTests checks with and
+    without a request and for sparse fieldsets.
+    """
+
+    field_names = (
+        "id",
+        "name",
+        "category",
+        "description",
+        "price",
+        "quantity",
+        "image",
+        "is_active",
+        "in_stock",
+        "created_at",
+        "updated_at",
+        "parameters",
+    )
+    relations = ("category", "parameters")
+
+    # Unbound fields only for the values whose formatting depends on settings
+    price_field = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+    def __init__(self, *args, fieldset=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fieldset = fieldset
+        # DateTimeField looks up the current timezone for every value; with
+        # many=True this child serializes the whole list, so look it up once
+        self.datetime_field = serializers.DateTimeField(
+            default_timezone=(
+                timezone.get_current_timezone() if settings.USE_TZ else None
+            )
+        )
+
+    @classmethod
+    def get_fieldset(cls, request):
+        return get_fieldset(request, cls.field_names, cls.relations)
+
+    def to_representation(self, product):
+        if self.fieldset is not None:
+            return {name: getter(product) for name, getter in self.getters}
+
+        to_datetime = self.datetime_field.to_representation
+        return {
+            "id": product.pk,
+            "name": product.name,
+            "category": self.category_data(product),
+            "description": product.description,
+            "price": self.price_field.to_representation(product.price),
+            "quantity": product.quantity,
+            "image": self.image_url(product.image),
+            "is_active": product.is_active,
+            "in_stock": product.quantity > 0,
+            "created_at": to_datetime(product.created_at),
+            "updated_at": to_datetime(product.updated_at),
+            "parameters": self.parameters_data(product),
+        }
+
+    @cached_property
+    def getters(self):
+        """(name, function of a product) for every field of the fieldset"""
+        to_datetime = self.datetime_field.to_representation
+        getters = {
+            "id": attrgetter("pk"),
+            "name": attrgetter("name"),
+            "category": (
+                self.category_data
+                if self.fieldset.expands("category")
+                else attrgetter("category_id")
+            ),
+            "description": attrgetter("description"),
+            "price": lambda product: self.price_field.to_representation(product.price),
+            "quantity": attrgetter("quantity"),
+            "image": lambda product: self.image_url(product.image),
+            "is_active": attrgetter("is_active"),
+            "in_stock": lambda product: product.quantity > 0,
+            "created_at": lambda product: to_datetime(product.created_at),
+            "updated_at": lambda product: to_datetime(product.updated_at),
+        }
+        if self.fieldset.expands("parameters"):
+            getters["parameters"] = self.parameters_data
+        return [
+            (name, getters[name]) for name in self.fieldset.fields if name in getters
+        ]
+
+    def category_data(self, product):
+        category = product.category
+        return {
+            "id": category.pk,
+            "name": category.name,
+            "description": category.description,
+        }
+
+    def parameters_data(self, product):
+        return [
+            {"name": parameter.parameter.name, "value": parameter.value}
+            for parameter in product.parameters.all()
+        ]
+
+    def image_url(self, image):
+        """Absolute URL when there is a request, like serializers.ImageField"""
+        if not image:
+            return None
+        request = self.context.get("request")
+        if request is not None:
+            return request.build_absolute_uri(image.url)
+        return image.url
+
+
+# Status of a queued YAML import
+class ImportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ImportJob
+        fields = [
+            "id",
+            "supplier_name",
+            "status",
+            "stats",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+        ]
+        read_only_fields = fields
@@ -0,0 +1,51 @@
+from celery import shared_task
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import ImportJob
+from .utils.yaml_importer import YAMLImporter
+
+
+def start_import_job(file, supplier_name, user=None):
+    """Store an uploaded feed on an ImportJob and queue it"""
+    job = ImportJob.objects.create(
+        file=file, supplier_name=supplier_name, created_by=user
+    )
+    run_import_job.delay(job.pk)
+    # In eager mode the job has already finished at this point
+    job.refresh_from_db()
+    return job
+
+
+@shared_task
+def run_import_job(job_id):
+    """Run a queued YAML import and record the outcome on the job"""
+    job = ImportJob.objects.get(pk=job_id)
+    job.status = ImportJob.Status.RUNNING
+    job.started_at = timezone.now()
+    job.save(update_fields=["status", "started_at"])
+
+    # The import runs in one transaction, so progress is published through
+    # the cache where the status endpoint can see it before the commit
+    def save_progress(stats):
+        cache.set(job.progress_cache_key, stats, timeout=60 * 60)
+
+    importer = YAMLImporter(bulk=True, progress_callback=save_progress)
+    try:
+        job.stats = importer.import_from_file(
+            job.file.path, job.supplier_name, stream=True
+        )
+        job.status = ImportJob.Status.SUCCESS
+    except Exception as e:
+        job.stats = importer.stats
+        job.status = ImportJob.Status.FAILED
+        job.error = str(e)
+    finally:
+        # Feeds can be up to YAML_IMPORT_MAX_UPLOAD_SIZE each, so none is
+        # kept once its job has ended
+        job.file.delete(save=False)
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=["file", "stats", "status", "error", "finished_at"])
+    cache.delete(job.progress_cache_key)
+    return job.status
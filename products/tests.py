@@ -1,3 +1,571 @@
-from django.test import TestCase
+import base64
+import gc
+import json
+import os
+import tempfile
+import tracemalloc
+from itertools import product
+from pathlib import Path
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from django.core.cache import cache, caches
+from django.db import DatabaseError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from .benchmarks.catalog import PRODUCTS_URL, seed_catalog
+from .benchmarks.feed_generator import generate_feed
+from .benchmarks.query_plans import analyze, check_query_plans
+from .cache import bump_catalog_version, get_catalog_version
+from .facets import refresh_category_counts
+from .models import Category, Parameter, ParameterFacet, Product, ProductParameter
+from .pagination import CatalogPagination, KeysetPagination
+from .search import InMemorySearchBackend, get_search_backend
+from .serializers import ProductReadSerializer, ProductSerializer
+from .utils.yaml_importer import YAMLImporter
+
+# Tests must never read or clear the cache of a running server
+LOCMEM_CACHES = {
+    alias: {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": f"test-{alias}",
+        "TIMEOUT": None if alias == "catalog" else 300,
+    }
+    for alias in ["default", "catalog"]
+}
+
+# Two goods with the same name, each with a parameter the other lacks
+REPEATED_GOODS = {
+    "shop": "Test shop",
+    "categories": [{"id": 1, "name": "Phones"}],
+    "goods": [
+        {
+            "id": 1,
+            "category": 1,
+            "name": "Phone",
+            "price": 100,
+            "quantity": 1,
+            "parameters": {"Color": "red", "Memory": "64"},
+        },
+        {
+            "id": 2,
+            "category": 1,
+            "name": "Phone",
+            "price": 90,
+            "quantity": 2,
+            "parameters": {"Color": "blue", "Screen": "6.1"},
+        },
+    ],
+}
+
+# One good of each kind the products table refuses, next to a valid one
+INVALID_GOODS = {
+    "shop": "Test shop",
+    "categories": [{"id": 1, "name": "Phones"}],
+    "goods": [
+        {"id": 1, "category": 1, "name": "Phone", "price": 100, "quantity": 1},
+        {"id": 2, "category": 1, "name": "Returned", "price": 100, "quantity": -1},
+        {"id": 3, "category": 1, "name": "Refund", "price": -5, "quantity": 1},
+        {"id": 4, "category": 1, "name": "Gold", "price": "1e10", "quantity": 1},
+    ],
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class YAMLImporterTests(TestCase):
+    def imported_parameters(self, **options):
+        YAMLImporter(**options).import_data(REPEATED_GOODS, "Test supplier")
+        return dict(ProductParameter.objects.values_list("parameter__name", "value"))
+
+    def test_bulk_import_writes_the_same_parameters_as_per_row(self):
+        expected = {"Color": "blue", "Memory": "64", "Screen": "6.1"}
+        self.assertEqual(self.imported_parameters(), expected)
+        ProductParameter.objects.all().delete()
+        self.assertEqual(self.imported_parameters(bulk=True), expected)
+
+    def test_invalid_goods_are_counted_as_errors_in_every_mode(self):
+        for options in [{}, {"bulk": True}]:
+            with self.subTest(**options):
+                Product.objects.all().delete()
+                stats = YAMLImporter(**options).import_data(
+                    INVALID_GOODS, "Test supplier"
+                )
+                self.assertEqual(stats["errors"], 3)
+                self.assertEqual(stats["products_created"], 1)
+                self.assertQuerySetEqual(
+                    Product.objects.values_list("name", flat=True), ["Phone"]
+                )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CategoryCountTests(TestCase):
+    def setUp(self):
+        self.phones = Category.objects.create(name="Phones")
+        self.laptops = Category.objects.create(name="Laptops")
+        self.product = Product.objects.create(
+            name="Phone", category=self.phones, price=100, quantity=1
+        )
+
+    def assertCounts(self, phones, laptops):
+        counts = dict(Category.objects.values_list("name", "active_product_count"))
+        self.assertEqual(counts, {"Phones": phones, "Laptops": laptops})
+
+    def test_counts_follow_creation_moves_deactivation_and_deletion(self):
+        self.assertCounts(1, 0)
+        self.product.category = self.laptops
+        self.product.save()
+        self.assertCounts(0, 1)
+        self.product.is_active = False
+        self.product.save()
+        self.assertCounts(0, 0)
+        self.product.is_active = True
+        self.product.save()
+        self.assertCounts(0, 1)
+        self.product.delete()
+        self.assertCounts(0, 0)
+
+    def test_saves_that_keep_category_and_state_do_not_recount(self):
+        self.product.price = 90
+        with CaptureQueriesContext(connection) as queries:
+            self.product.save()
+        table = Category._meta.db_table
+        self.assertFalse(
+            [query for query in queries if f'UPDATE "{table}"' in query["sql"]]
+        )
+        self.assertCounts(1, 0)
+
+    def test_product_edits_adjust_counts_without_counting(self):
+        with CaptureQueriesContext(connection) as queries:
+            Product.objects.create(
+                name="Laptop", category=self.laptops, price=100, quantity=1
+            )
+            self.product.category = self.laptops
+            self.product.save()
+            self.product.delete()
+        self.assertFalse([query for query in queries if "COUNT(" in query["sql"]])
+        self.assertCounts(0, 1)
+
+    def test_refresh_repairs_drifted_counts(self):
+        Category.objects.update(active_product_count=5)
+        refresh_category_counts()
+        self.assertCounts(1, 0)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FacetRefreshTests(TestCase):
+    def setUp(self):
+        YAMLImporter(incremental=True).import_data(REPEATED_GOODS, "Test supplier")
+
+    def facets(self):
+        return set(
+            ParameterFacet.objects.values_list(
+                "category__name", "parameter__name", "value", "product_count"
+            )
+        )
+
+    def test_import_refreshes_facets_of_its_categories(self):
+        self.assertIn(("Phones", "Color", "blue", 1), self.facets())
+        other = ParameterFacet.objects.create(
+            category=Category.objects.create(name="Laptops"),
+            parameter=Parameter.objects.get(name="Color"),
+            value="grey",
+            product_count=7,
+        )
+        feed = {**REPEATED_GOODS, "goods": REPEATED_GOODS["goods"][:1]}
+        YAMLImporter(bulk=True).import_data(feed, "Test supplier")
+        self.assertIn(("Phones", "Color", "red", 1), self.facets())
+        self.assertTrue(ParameterFacet.objects.filter(pk=other.pk).exists())
+
+    def test_unchanged_incremental_import_refreshes_nothing(self):
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks() as callbacks:
+                stats = YAMLImporter(incremental=True).import_data(
+                    REPEATED_GOODS, "Test supplier"
+                )
+        self.assertEqual(stats["goods_changed"], 0)
+        self.assertEqual(callbacks, [])
+        tables = [ParameterFacet._meta.db_table, Category._meta.db_table]
+        self.assertFalse(
+            [
+                query
+                for query in queries
+                if any(f'"{table}"' in query["sql"] for table in tables)
+                and not query["sql"].startswith("SELECT")
+            ]
+        )
+
+    def test_edits_refresh_facets(self):
+        product = Product.objects.get()
+        product.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        self.assertEqual(self.facets(), set())
+        product.is_active = True
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        self.assertIn(("Phones", "Color", "blue", 1), self.facets())
+        with self.captureOnCommitCallbacks(execute=True):
+            product.parameters.get(parameter__name="Color").delete()
+        self.assertNotIn(("Phones", "Color", "blue", 1), self.facets())
+
+    def test_a_transaction_refreshes_facets_once(self):
+        product = Product.objects.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            for name in ["Weight", "Height", "Width"]:
+                ProductParameter.objects.create(
+                    product=product, parameter=Parameter.objects.create(name=name)
+                )
+        table = ParameterFacet._meta.db_table
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                product.delete()
+        refreshes = [
+            q for q in queries if q["sql"].startswith(f'DELETE FROM "{table}"')
+        ]
+        self.assertEqual(len(refreshes), 1)
+        self.assertEqual(self.facets(), set())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class StreamingImportMemoryTests(TestCase):
+    """
+    Peak Python memory of a streaming import must not grow while goods are
+    read: the rest of the import, finish_import included, has to stay under
+    the peak of its first quarter. Garbage is collected after every batch
+    so that the peaks do not depend on when the collector runs.
+    IMPORT_MEMORY_TEST_GOODS=7700000 runs it on a 1 GB feed.
+    """
+
+    batch_size = 50
+
+    def test_peak_memory_does_not_grow_with_the_feed(self):
+        goods = int(os.getenv("IMPORT_MEMORY_TEST_GOODS", "2000"))
+        with tempfile.TemporaryDirectory() as feeds_dir:
+            feed = Path(feeds_dir) / "feed.yaml"
+            generate_feed(feed, goods)
+
+            peaks = []
+
+            def record_warm_up_peak(stats):
+                gc.collect()
+                written = stats["products_created"] + stats["products_updated"]
+                if not peaks and written >= goods // 4:
+                    peaks.append(tracemalloc.get_traced_memory()[1])
+                    tracemalloc.reset_peak()
+
+            importer = YAMLImporter(
+                bulk=True,
+                batch_size=self.batch_size,
+                progress_callback=record_warm_up_peak,
+            )
+            # Facet rows are written in batches too; keep them below the feed
+            with mock.patch("products.facets.FACET_BATCH_SIZE", self.batch_size):
+                tracemalloc.start()
+                try:
+                    importer.import_from_file(str(feed), "Supplier", stream=True)
+                    peaks.append(tracemalloc.get_traced_memory()[1])
+                finally:
+                    tracemalloc.stop()
+
+        warm_up, rest = peaks
+        self.assertLess(rest, warm_up * 1.1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ProductQueryCountTests(TestCase):
+    """
+    Product pages load categories and parameters up front, so their query
+    counts depend on neither the page size nor the parameters per product
+    """
+
+    def seed(self, products, parameters):
+        """A category of products with `parameters` parameters each"""
+        category = Category.objects.create(name=f"{products} x {parameters}")
+        created = Product.objects.bulk_create(
+            Product(name=f"Phone {i}", category=category, price=100, quantity=1)
+            for i in range(products)
+        )
+        ProductParameter.objects.bulk_create(
+            ProductParameter(
+                product=item,
+                parameter=Parameter.objects.get_or_create(name=f"Parameter {i}")[0],
+                value="1",
+            )
+            for item in created
+            for i in range(parameters)
+        )
+        return category
+
+    def test_product_pages_run_a_fixed_number_of_queries(self):
+        for page_size, parameters in product([5, 20], [1, 3]):
+            category = self.seed(page_size, parameters)
+            pages = [
+                ("/api/products/products/", 3),
+                ("/api/products/products/featured/", 2),
+                (f"/api/products/categories/{category.pk}/products/", 3),
+            ]
+            for url, queries in pages:
+                with self.subTest(url, page_size=page_size, parameters=parameters):
+                    # Bulk inserts leave cached responses of earlier rounds
+                    cache.clear()
+                    with (
+                        mock.patch.object(CatalogPagination, "page_size", page_size),
+                        self.assertNumQueries(queries),
+                    ):
+                        response = self.client.get(url)
+                    self.assertEqual(response.status_code, 200)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+@mock.patch.object(KeysetPagination, "page_size", 3)
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Phones")
+        # Repeated prices make id the tiebreaker across page boundaries
+        Product.objects.bulk_create(
+            Product(name=f"Phone {i}", category=category, price=i % 3, quantity=1)
+            for i in range(8)
+        )
+        get_search_backend().rebuild()
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def walk(self, url, link):
+        """Names on every page from url on, following the link of each page"""
+        pages = []
+        while url:
+            page = self.get(url)
+            pages.append([item["name"] for item in page["results"]])
+            url = page[link]
+        return pages
+
+    def test_next_and_previous_links_walk_every_ordering(self):
+        for ordering in ["price", "-price", "name", "-created_at"]:
+            with self.subTest(ordering=ordering):
+                expected = [
+                    item["name"]
+                    for item in self.get(f"{PRODUCTS_URL}?ordering={ordering}")[
+                        "results"
+                    ]
+                ]
+                forward = self.walk(
+                    f"{PRODUCTS_URL}?pagination=cursor&ordering={ordering}", "next"
+                )
+                self.assertEqual(sum(forward, []), expected)
+
+                # Back from the last page, which is reached through a cursor
+                last = self.get(f"{PRODUCTS_URL}?pagination=cursor&ordering={ordering}")
+                while last["next"]:
+                    url, last = last["next"], self.get(last["next"])
+                backward = self.walk(url, "previous")
+                self.assertEqual(backward, forward[::-1])
+
+    def next_cursor(self, query):
+        link = self.get(f"{PRODUCTS_URL}?pagination=cursor&{query}")["next"]
+        return parse_qs(urlsplit(link).query)["cursor"][0]
+
+    def cursor(self, **cursor):
+        token = base64.urlsafe_b64encode(json.dumps(cursor).encode("utf-8"))
+        return token.decode("ascii")
+
+    def test_cursors_that_do_not_fit_the_request_are_not_found(self):
+        pk = Product.objects.earliest("pk").pk
+        price_cursor = self.next_cursor("ordering=price")
+        search_cursor = self.next_cursor("search=phone")
+        cases = {
+            "not base64": ("price", "!!!"),
+            "not a value of the column": (
+                "price",
+                self.cursor(o="price", v="abc", pk=pk, r=False),
+            ),
+            "no value": ("price", self.cursor(o="price", v=None, pk=pk, r=False)),
+            "not an id": ("price", self.cursor(o="price", v="1", pk="x", r=False)),
+            "no ordering": ("price", self.cursor(v="1", pk=pk, r=False)),
+            "another ordering": ("name", price_cursor),
+            "a search cursor without the search": (None, search_cursor),
+        }
+        for case, (ordering, cursor) in cases.items():
+            with self.subTest(case):
+                params = {"cursor": cursor}
+                if ordering:
+                    params["ordering"] = ordering
+                response = self.client.get(PRODUCTS_URL, params)
+                self.assertEqual(response.status_code, 404)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class QueryPlanTests(TestCase):
+    """
+    Every product list filter, ordering and pagination is served from an
+    index on a small seeded catalog, never by scanning the products table
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalog(2000, categories=20)
+        analyze()
+
+    def test_product_list_queries_do_not_scan_the_product_table(self):
+        for result in check_query_plans():
+            with self.subTest(
+                result["filter"],
+                ordering=result["ordering"],
+                pagination=result["pagination"],
+            ):
+                self.assertFalse(result["full_scan"], result["plan"])
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    PRODUCT_SEARCH_BACKEND="products.search.InMemorySearchBackend",
+)
+class InMemorySearchBackendTests(TestCase):
+    def setUp(self):
+        caches["catalog"].clear()
+        InMemorySearchBackend.index = InMemorySearchBackend.version = None
+        self.addCleanup(setattr, InMemorySearchBackend, "index", None)
+        self.addCleanup(setattr, InMemorySearchBackend, "version", None)
+        self.category = Category.objects.create(name="Kitchen")
+        self.kettle = Product.objects.create(
+            name="Kettle", category=self.category, price=10
+        )
+        self.assertEqual(self.found("kettle"), {"Kettle"})
+
+    def found(self, query):
+        backend = InMemorySearchBackend()
+        return set(
+            backend.search(Product.objects.all(), query).values_list("name", flat=True)
+        )
+
+    def test_writes_of_this_process_are_indexed_on_commit(self):
+        color = Parameter.objects.create(name="Color")
+        with self.captureOnCommitCallbacks(execute=True):
+            toaster = Product.objects.create(
+                name="Toaster", category=self.category, price=20
+            )
+            ProductParameter.objects.create(
+                product=self.kettle, parameter=color, value="Steel"
+            )
+            self.assertEqual(self.found("toaster"), set())
+        # Only the signals may have indexed the writes, not a catch-up
+        InMemorySearchBackend.version = get_catalog_version()
+        self.assertEqual(self.found("toaster"), {"Toaster"})
+        self.assertEqual(self.found("steel"), {"Kettle"})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            toaster.delete()
+        self.assertNotIn(toaster.pk, InMemorySearchBackend.index.documents)
+
+    def test_writes_of_other_processes_are_caught_up_with(self):
+        # Like writes made by another process: no signals reach this one
+        Product.objects.bulk_create(
+            [Product(name="Toaster", category=self.category, price=20)]
+        )
+        Product.objects.filter(pk=self.kettle.pk).update(
+            name="Teapot", updated_at=timezone.now()
+        )
+        self.assertEqual(self.found("toaster"), set())
+
+        bump_catalog_version()
+        with mock.patch.object(
+            InMemorySearchBackend, "build_index", side_effect=AssertionError
+        ):
+            self.assertEqual(self.found("toaster"), {"Toaster"})
+            self.assertEqual(self.found("teapot"), {"Teapot"})
+            self.assertEqual(self.found("kettle"), set())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CatalogVersionTests(TestCase):
+    def bumps(self, callbacks):
+        return [func for func in callbacks if func is bump_catalog_version]
+
+    def test_a_transaction_bumps_the_version_once(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            category = Category.objects.create(name="Phones")
+            for i in range(3):
+                Product.objects.create(name=f"Phone {i}", category=category, price=1)
+        self.assertEqual(len(self.bumps(callbacks)), 1)
+
+    def test_a_bump_rolled_back_with_its_savepoint_is_registered_again(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            try:
+                with transaction.atomic():
+                    Category.objects.create(name="Phones")
+                    raise DatabaseError
+            except DatabaseError:
+                pass
+            Category.objects.create(name="Laptops")
+        self.assertEqual(len(self.bumps(callbacks)), 1)
+
+    def test_the_version_outlives_the_cached_responses(self):
+        version = get_catalog_version()
+        cache.clear()
+        self.assertEqual(get_catalog_version(), version)
+
+    def test_a_lost_version_never_comes_back(self):
+        seen = {get_catalog_version()}
+        bump_catalog_version()
+        seen.add(get_catalog_version())
+        caches["catalog"].clear()
+        self.assertNotIn(get_catalog_version(), seen)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ProductReadSerializerTests(TestCase):
+    """ProductReadSerializer must render exactly what ProductSerializer does"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Phones", description="Mobile")
+        color = Parameter.objects.create(name="Color")
+        for i, image in enumerate(["", "products/phone.jpg"]):
+            product = Product.objects.create(
+                name=f"Phone {i}",
+                category=category,
+                description="A phone",
+                price="99.90",
+                quantity=i,
+                image=image,
+            )
+            ProductParameter.objects.create(product=product, parameter=color, value=i)
+
+    def assertSameOutput(self, context, fieldset=None):
+        products = list(Product.objects.with_details())
+        self.assertEqual(
+            ProductReadSerializer(
+                products, many=True, context=context, fieldset=fieldset
+            ).data,
+            ProductSerializer(
+                products, many=True, context=context, fieldset=fieldset
+            ).data,
+        )
+
+    def request(self, **params):
+        return Request(APIRequestFactory().get("/api/products/products/", params))
+
+    def test_output_without_a_request(self):
+        self.assertSameOutput({})
+
+    def test_output_with_a_request(self):
+        self.assertSameOutput({"request": self.request()})
+
+    def test_output_with_a_fieldset(self):
+        for params in [
+            {"fields": "id,name,category,price,image,created_at,parameters"},
+            {"fields": "id,category,parameters,in_stock", "expand": "parameters"},
+            {"expand": "category"},
+        ]:
+            with self.subTest(**params):
+                request = self.request(**params)
+                self.assertSameOutput(
+                    {"request": request}, ProductReadSerializer.get_fieldset(request)
+                )
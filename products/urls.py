@@ -10,4 +10,10 @@ router.register(r"products", views.ProductViewSet)
 urlpatterns = [
     path("", include(router.urls)),
     path("import-yaml/", views.import_yaml, name="import-yaml"),
+    path(
+        "import-yaml/<int:pk>/",
+        views.import_yaml_status,
+        name="import-yaml-status",
+    ),
+    path("cache-stats/", views.catalog_cache_stats, name="catalog-cache-stats"),
 ]
@@ -0,0 +1,161 @@
+"""
+Loading supplier feeds in every supported format.
+
+All formats share the YAML feed schema (shop / categories / goods):
+
+* YAML - parsed with libyaml's CSafeLoader when PyYAML is built with it
+* JSON - one document holding a shop or a list of shops
+* JSON Lines - one object per line; a line with a "shop" or "categories"
+  key starts a new shop (it may carry its own goods), every other line is
+  a good of the current shop
+
+The format is taken from the file extension and, failing that, sniffed
+from the first bytes of the file.
+"""
+
+import json
+from contextlib import contextmanager
+
+import yaml
+
+from products.utils.yaml_stream import PRODUCT_KEYS, YAMLStreamReader
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader
+
+YAML = "yaml"
+JSON = "json"
+JSON_LINES = "jsonl"
+
+EXTENSIONS = {
+    ".yaml": YAML,
+    ".yml": YAML,
+    ".json": JSON,
+    ".jsonl": JSON_LINES,
+    ".ndjson": JSON_LINES,
+}
+
+SHOP_KEYS = ["shop", "categories", "Categories"]
+
+
+def detect_format(file_path):
+    """Guess the feed format from the extension or the file's first line"""
+    for extension, feed_format in EXTENSIONS.items():
+        if str(file_path).lower().endswith(extension):
+            return feed_format
+
+    with open(file_path, "r", encoding="utf-8") as file:
+        first_line = file.readline().strip()
+        has_more = bool(file.readline().strip())
+
+    if first_line.startswith("["):
+        return JSON
+    if first_line.startswith("{"):
+        try:
+            json.loads(first_line)
+        except ValueError:
+            # An object spread over several lines
+            return JSON
+        return JSON_LINES if has_more else JSON
+    return YAML
+
+
+def load_feed(file_path, feed_format=None):
+    """Parse a whole feed into Python objects"""
+    feed_format = feed_format or detect_format(file_path)
+
+    with open(file_path, "r", encoding="utf-8") as file:
+        if feed_format == JSON:
+            return json.load(file)
+        if feed_format == JSON_LINES:
+            shops = []
+            for shop_data, goods in JSONLinesReader(file).iter_shops():
+                shops.append({**shop_data, "goods": list(goods)})
+            return shops
+        return yaml.load(file, Loader=SafeLoader)
+
+
+@contextmanager
+def stream_feed(file_path, feed_format=None):
+    """
+    Open a feed and yield an iterator of (shop_data, goods) pairs where
+    goods are produced one at a time
+    """
+    feed_format = feed_format or detect_format(file_path)
+
+    if feed_format == YAML:
+        with open(file_path, "rb") as file:
+            reader = YAMLStreamReader(file)
+            try:
+                yield reader.iter_shops()
+            finally:
+                reader.close()
+    elif feed_format == JSON_LINES:
+        with open(file_path, "r", encoding="utf-8") as file:
+            yield JSONLinesReader(file).iter_shops()
+    else:
+        # The json module cannot stream, but it still beats YAML parsing
+        yield iter_loaded_shops(load_feed(file_path, JSON))
+
+
+def iter_loaded_shops(data):
+    """Split already parsed shops into (shop_data, goods) pairs"""
+    if isinstance(data, dict):
+        data = [data]
+
+    for shop_data in data or []:
+        if not isinstance(shop_data, dict):
+            yield shop_data, iter(())
+            continue
+
+        shop_data = dict(shop_data)
+        goods = []
+        for key in PRODUCT_KEYS:
+            if key in shop_data:
+                goods = shop_data.pop(key)
+                break
+        yield shop_data, iter(goods if isinstance(goods, list) else [goods])
+
+
+class JSONLinesReader:
+    """Read a JSON Lines feed one record at a time"""
+
+    def __init__(self, file):
+        self.lines = iter(file)
+        self.next_record = None
+
+    def read_record(self):
+        for line in self.lines:
+            if line.strip():
+                return json.loads(line)
+        return None
+
+    def is_shop(self, record):
+        return isinstance(record, dict) and any(key in record for key in SHOP_KEYS)
+
+    def iter_shops(self):
+        """Yield (shop_data, goods_iterator) for every shop in the feed"""
+        self.next_record = self.read_record()
+        while self.next_record is not None:
+            if self.is_shop(self.next_record):
+                shop_data, inline_goods = next(iter_loaded_shops(self.next_record))
+                self.next_record = self.read_record()
+            else:
+                # Goods before the first shop line belong to an unnamed shop
+                shop_data, inline_goods = {}, iter(())
+
+            goods = self.iter_goods(inline_goods)
+            yield shop_data, goods
+            # Skip whatever the caller left unread before the next shop
+            for _ in goods:
+                pass
+
+    def iter_goods(self, inline_goods):
+        """Goods carried by the shop line, then the lines that follow it"""
+        yield from inline_goods
+        while self.next_record is not None and not self.is_shop(self.next_record):
+            good = self.next_record
+            self.next_record = self.read_record()
+            yield good
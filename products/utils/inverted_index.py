@@ -0,0 +1,98 @@
+import re
+import sys
+import threading
+from bisect import bisect_left
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """Lower-cased words of text, interned so documents share token strings"""
+    if not text:
+        return []
+    return [sys.intern(token) for token in TOKEN_RE.findall(text.lower())]
+
+
+class InvertedIndex:
+    """
+    Token -> document ids postings. The tokens of every document are kept
+    too, so a document can be replaced or removed without a full rebuild.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.documents = {}
+        # Sorted tokens for prefix lookups, rebuilt after the vocabulary changes
+        self.vocabulary = None
+        self.lock = threading.RLock()
+
+    def add(self, doc_id, texts):
+        """Index (or re-index) a document made of several texts"""
+        # A tuple takes a fraction of the memory of a frozenset
+        tokens = tuple({token for text in texts for token in tokenize(text)})
+        with self.lock:
+            self.remove(doc_id)
+            self.documents[doc_id] = tokens
+            for token in tokens:
+                posting = self.postings.get(token)
+                if posting is None:
+                    self.postings[token] = {doc_id}
+                    self.vocabulary = None
+                else:
+                    posting.add(doc_id)
+
+    def remove(self, doc_id):
+        """Drop a document from the index"""
+        with self.lock:
+            for token in self.documents.pop(doc_id, ()):
+                posting = self.postings[token]
+                posting.discard(doc_id)
+                if not posting:
+                    del self.postings[token]
+                    self.vocabulary = None
+
+    def expand(self, prefix):
+        """Indexed tokens that start with prefix"""
+        if self.vocabulary is None:
+            self.vocabulary = sorted(self.postings)
+        vocabulary = self.vocabulary
+        end = start = bisect_left(vocabulary, prefix)
+        while end < len(vocabulary) and vocabulary[end].startswith(prefix):
+            end += 1
+        return vocabulary[start:end]
+
+    def search(self, query):
+        """Ids of documents where every word of query starts some token"""
+        with self.lock:
+            result = None
+            # Longer words tend to be more selective, so intersect them first
+            for term in sorted(set(tokenize(query)), key=len, reverse=True):
+                tokens = self.expand(term)
+                if len(tokens) == 1:
+                    matches = self.postings[tokens[0]]
+                else:
+                    matches = set().union(*(self.postings[t] for t in tokens))
+                result = set(matches) if result is None else result & matches
+                if not result:
+                    break
+            return result or set()
+
+    def memory_usage(self):
+        """Counts and approximate size in bytes of everything the index holds"""
+        with self.lock:
+            size = sys.getsizeof(self.postings) + sys.getsizeof(self.documents)
+            size += sys.getsizeof(self.vocabulary or [])
+            size += sum(
+                sys.getsizeof(token) + sys.getsizeof(posting)
+                for token, posting in self.postings.items()
+            )
+            size += sum(
+                sys.getsizeof(doc_id) + sys.getsizeof(tokens)
+                for doc_id, tokens in self.documents.items()
+            )
+            return {
+                "documents": len(self.documents),
+                "tokens": len(self.postings),
+                "postings": sum(len(posting) for posting in self.postings.values()),
+                "bytes": size,
+            }
@@ -0,0 +1,62 @@
+import time
+
+import django
+
+from products.utils.feed_loader import load_feed
+from products.utils.yaml_importer import YAMLImporter
+
+
+class FeedNormalizer(YAMLImporter):
+    """
+    Parse a feed into plain rows without touching the database.
+    Categories are kept as names and resolved later by the single writer,
+    so worker processes never race on the unique Category.name.
+    """
+
+    def create_or_get_category(self, name):
+        return name.strip()
+
+    def get_default_category(self):
+        return None
+
+    def normalize(self, data):
+        """Turn parsed YAML into a list of shops with parsed goods"""
+        shops = []
+        for shop_data in self.normalize_data_structure(data):
+            if not isinstance(shop_data, dict):
+                self.log(f"Skipping non-dict shop data: {type(shop_data)}", "warning")
+                continue
+
+            categories_map = self.extract_categories(shop_data)
+            products_list = self.extract_products(shop_data)
+            shops.append(
+                {
+                    "shop": shop_data.get("shop"),
+                    "categories": list(dict.fromkeys(categories_map.values())),
+                    "goods": list(self.iter_rows(products_list, categories_map)),
+                }
+            )
+        return shops
+
+
+def init_worker():
+    """Make models importable in spawned worker processes"""
+    django.setup()
+
+
+def parse_feed(file_path, supplier_name):
+    """Worker task: parse one feed file into normalized shops"""
+    start = time.perf_counter()
+    data = load_feed(file_path)
+
+    normalizer = FeedNormalizer()
+    shops = normalizer.normalize(data)
+
+    return {
+        "file": str(file_path),
+        "supplier": supplier_name,
+        "shops": shops,
+        "goods": sum(len(shop["goods"]) for shop in shops),
+        "errors": normalizer.stats["errors"],
+        "parse_seconds": time.perf_counter() - start,
+    }
@@ -1,17 +1,46 @@
-from decimal import Decimal
+import hashlib
+import json
+from decimal import Decimal, InvalidOperation
 
-import yaml
+from django.core.exceptions import ValidationError
 from django.db import transaction
+from django.utils import timezone
 
-from products.models import Category, Product
-from suppliers.models import Supplier, SupplierProduct
+from products.cache import bump_catalog_version_on_commit
+from products.facets import refresh_category_counts, refresh_facets
+from products.models import Category, Parameter, Product, ProductParameter
+from products.search import get_search_backend
+from products.utils.feed_loader import load_feed, stream_feed
+from products.utils.yaml_stream import PRODUCT_KEYS
+from suppliers.models import ImportFingerprint, Supplier, SupplierProduct
+from suppliers.offers import refresh_best_offers
+
+DEFAULT_BATCH_SIZE = 1000
 
 
 class YAMLImporter:
     """Universal YAML importer for product data"""
 
-    def __init__(self, verbose=False):
+    def __init__(
+        self,
+        verbose=False,
+        bulk=False,
+        batch_size=DEFAULT_BATCH_SIZE,
+        incremental=False,
+        progress_callback=None,
+    ):
         self.verbose = verbose
+        # Called with self.stats after every written batch
+        self.progress_callback = progress_callback
+        # Bulk mode resolves existing rows per chunk and writes them with
+        # bulk inserts and ON CONFLICT upserts instead of one round trip
+        # per good
+        self.bulk = bulk
+        self.batch_size = batch_size
+        # Incremental mode skips goods whose content hash did not change
+        # since the supplier's previous import (implies bulk writes)
+        self.incremental = incremental
+        self.started_at = None
         self.stats = {
             "categories_created": 0,
             "products_created": 0,
@@ -19,7 +48,22 @@ class YAMLImporter:
             "supplier_products_created": 0,
             "supplier_products_updated": 0,
             "errors": 0,
+            "category_cache_hits": 0,
+            "category_cache_misses": 0,
+            "parameters_created": 0,
+            "product_parameters_written": 0,
+            "goods_unchanged": 0,
+            "goods_changed": 0,
+            "goods_removed": 0,
         }
+        # Category name -> Category, filled by preload_categories()
+        self.category_cache = None
+        # Parameter name -> Parameter, filled by preload_parameters()
+        self.parameter_cache = None
+        # Ids of the categories whose products were written (before and
+        # after a move), so finish_import refreshes only their counts and
+        # facets
+        self.touched_categories = set()
 
     def log(self, message, style="info"):
         """Log message based on verbosity"""
@@ -27,16 +71,39 @@ class YAMLImporter:
             print(f"[{style.upper()}] {message}")
 
     @transaction.atomic
-    def import_from_file(self, file_path, supplier_name):
-        """Import data from YAML file"""
-        with open(file_path, "r", encoding="utf-8") as file:
-            data = yaml.safe_load(file)
+    def import_from_file(self, file_path, supplier_name, stream=False):
+        """Import data from a YAML, JSON or JSON Lines feed file"""
+        if stream:
+            with stream_feed(file_path) as shops:
+                return self.import_stream(shops, supplier_name)
+
+        return self.import_data(load_feed(file_path), supplier_name)
+
+    @transaction.atomic
+    def import_stream(self, shops, supplier_name):
+        """
+        Import (shop_data, goods) pairs from stream_feed() without loading
+        the feed as a whole. Goods are read one at a time and written in
+        bulk batches, so memory use does not grow with the size of the feed.
+        """
+        self.started_at = timezone.now()
+        self.preload_categories()
+        self.preload_parameters()
+        supplier, created = self.get_or_create_supplier(supplier_name)
 
-        return self.import_data(data, supplier_name)
+        for shop_data, goods in shops:
+            self.process_shop(shop_data, supplier, goods=goods)
+
+        self.finish_import(supplier)
+        return self.stats
 
     @transaction.atomic
     def import_data(self, data, supplier_name):
         """Import data from parsed YAML"""
+        self.started_at = timezone.now()
+        self.preload_categories()
+        self.preload_parameters()
+
         # Get or create supplier
         supplier, created = self.get_or_create_supplier(supplier_name)
 
@@ -47,8 +114,77 @@ class YAMLImporter:
         for shop_data in shop_list:
             self.process_shop(shop_data, supplier)
 
+        self.finish_import(supplier)
+        return self.stats
+
+    @transaction.atomic
+    def import_normalized(self, shops, supplier_name):
+        """
+        Import shops already parsed by FeedNormalizer, where categories are
+        plain names and every good is a parsed row
+        """
+        self.started_at = timezone.now()
+        self.preload_categories()
+        self.preload_parameters()
+        supplier, created = self.get_or_create_supplier(supplier_name)
+
+        for shop in shops:
+            self.log(f"Processing shop: {shop['shop'] or supplier.name}")
+            categories = {
+                name: self.create_or_get_category(name) for name in shop["categories"]
+            }
+            rows = []
+            for row in shop["goods"]:
+                if row["category"] is None:
+                    category = self.get_default_category()
+                else:
+                    category = categories[row["category"]]
+                rows.append({**row, "category": category})
+            self.write_rows(rows, supplier)
+
+        self.finish_import(supplier)
         return self.stats
 
+    def finish_import(self, supplier):
+        """
+        Update the supplier's fingerprints, the parameter facets and
+        counts of the categories written to and the catalog cache version
+        once all shops are written
+        """
+        self.update_fingerprints(supplier)
+        # Nothing to refresh when no good was written or removed, like an
+        # incremental re-import of an unchanged feed
+        if self.touched_categories:
+            refresh_facets(self.touched_categories)
+            refresh_category_counts(self.touched_categories)
+        if self.touched_categories or self.stats["goods_removed"]:
+            # Bulk writes skip the signals that invalidate cached responses
+            bump_catalog_version_on_commit()
+
+    def update_fingerprints(self, supplier):
+        """Forget or expire the supplier's fingerprints"""
+        fingerprints = ImportFingerprint.objects.filter(supplier=supplier)
+
+        if not self.incremental:
+            # Goods were written without hashing, so the stored hashes no
+            # longer describe what is in the database
+            fingerprints.delete()
+            return
+
+        removed = fingerprints.filter(last_seen_at__lt=self.started_at)
+        seen = fingerprints.filter(last_seen_at__gte=self.started_at)
+        unavailable = SupplierProduct.objects.filter(
+            supplier=supplier,
+            product_id__in=removed.values("product_id"),
+            is_available=True,
+        ).exclude(product_id__in=seen.values("product_id"))
+        product_ids = list(unavailable.values_list("product_id", flat=True))
+        if product_ids:
+            unavailable.update(is_available=False)
+            refresh_best_offers(product_ids)
+        # Forget removed goods so they are imported again if they come back
+        self.stats["goods_removed"] = removed.delete()[0]
+
     def get_or_create_supplier(self, supplier_name):
         """Get or create supplier"""
         supplier, created = Supplier.objects.get_or_create(
@@ -83,8 +219,8 @@ class YAMLImporter:
             self.log(f"Unexpected data type: {type(data)}", "error")
             return []
 
-    def process_shop(self, shop_data, supplier):
-        """Process a single shop's data"""
+    def process_shop(self, shop_data, supplier, goods=None):
+        """Process a single shop's data, optionally with streamed goods"""
         if not isinstance(shop_data, dict):
             self.log(f"Skipping non-dict shop data: {type(shop_data)}", "warning")
             return
@@ -95,12 +231,20 @@ class YAMLImporter:
         # Extract categories
         categories_map = self.extract_categories(shop_data)
 
+        # Streamed goods are always written in batches
+        if goods is not None:
+            self.process_products_bulk(goods, supplier, categories_map)
+            return
+
         # Extract products
         products_list = self.extract_products(shop_data)
 
         # Process products
-        for product_data in products_list:
-            self.process_product(product_data, supplier, categories_map)
+        if self.bulk or self.incremental:
+            self.process_products_bulk(products_list, supplier, categories_map)
+        else:
+            for product_data in products_list:
+                self.process_product(product_data, supplier, categories_map)
 
     def extract_categories(self, shop_data):
         """Extract categories from shop data"""
@@ -147,9 +291,30 @@ class YAMLImporter:
         category = self.create_or_get_category(cat_name)
         categories_map[cat_name] = category
 
+    def preload_categories(self):
+        """Load every existing category into the importer's cache"""
+        self.category_cache = {
+            category.name: category for category in Category.objects.all()
+        }
+
+    def get_category(self, name):
+        """Get category by name from the cache, creating it on a miss"""
+        if self.category_cache is None:
+            self.preload_categories()
+
+        category = self.category_cache.get(name)
+        if category is not None:
+            self.stats["category_cache_hits"] += 1
+            return category, False
+
+        self.stats["category_cache_misses"] += 1
+        category, created = Category.objects.get_or_create(name=name)
+        self.category_cache[name] = category
+        return category, created
+
     def create_or_get_category(self, name):
         """Create or get category by name"""
-        category, created = Category.objects.get_or_create(name=name.strip())
+        category, created = self.get_category(name.strip())
         if created:
             self.stats["categories_created"] += 1
             self.log(f"Created category: {name}", "success")
@@ -160,9 +325,7 @@ class YAMLImporter:
         products = []
 
         # Try different product keys
-        product_keys = ["goods", "products", "Goods", "Products", "items", "Items"]
-
-        for key in product_keys:
+        for key in PRODUCT_KEYS:
             if key in shop_data:
                 items = shop_data[key]
                 if isinstance(items, list):
@@ -176,40 +339,359 @@ class YAMLImporter:
     def process_product(self, product_data, supplier, categories_map):
         """Process a single product"""
         try:
-            if not isinstance(product_data, dict):
-                self.log(f"Skipping non-dict product: {type(product_data)}", "warning")
-                return
-
-            # Extract basic info
-            name = self.extract_value(
-                product_data, ["name", "Name", "product", "Product"]
-            )
-            if not name:
-                self.log("Skipping product without name", "warning")
+            row = self.parse_product(product_data, categories_map)
+            if row is None:
                 return
 
-            # Extract category
-            category = self.extract_category(product_data, categories_map)
-
-            # Extract price and quantity
-            price = self.extract_price(product_data)
-            quantity = self.extract_quantity(product_data)
-
-            # Extract description
-            description = self.extract_description(product_data)
-
             # Create or update product
             product = self.create_or_update_product(
-                name, category, price, quantity, description
+                row["name"],
+                row["category"],
+                row["price"],
+                row["quantity"],
+                row["description"],
             )
 
             # Create supplier product link
-            self.create_supplier_product(product, supplier, price, quantity)
+            self.create_supplier_product(
+                product, supplier, row["price"], row["quantity"]
+            )
+
+            # Store parameters as ProductParameter rows
+            self.save_product_parameters([(product, row["parameters"])])
 
         except Exception as e:
             self.stats["errors"] += 1
             self.log(f"Error processing product: {str(e)}", "error")
 
+    def parse_product(self, product_data, categories_map):
+        """Extract normalized product fields, or None if the item is skipped"""
+        if not isinstance(product_data, dict):
+            self.log(f"Skipping non-dict product: {type(product_data)}", "warning")
+            return None
+
+        # Extract basic info
+        name = self.extract_value(product_data, ["name", "Name", "product", "Product"])
+        if not name:
+            self.log("Skipping product without name", "warning")
+            return None
+
+        # Feed id of the good, used to fingerprint it in incremental imports
+        external_id = self.extract_value(
+            product_data, ["id", "Id", "ID", "external_id", "sku"]
+        )
+
+        price, quantity = self.clean_stock(
+            name, self.extract_price(product_data), self.extract_quantity(product_data)
+        )
+
+        return {
+            "external_id": external_id[:100] if external_id else None,
+            "name": name,
+            "category": self.extract_category(product_data, categories_map),
+            "price": price,
+            "quantity": quantity,
+            "description": self.extract_description(product_data),
+            "parameters": self.extract_parameters(product_data),
+        }
+
+    def clean_stock(self, name, price, quantity):
+        """
+        Price rounded to cents and quantity, validated against the Product
+        columns they are written to. Goods the database would refuse raise
+        ValueError, which both import modes count as an error, instead of
+        failing a whole bulk batch.
+        """
+        try:
+            price = Product._meta.get_field("price").clean(
+                price.quantize(Decimal("0.01")), None
+            )
+            quantity = Product._meta.get_field("quantity").clean(quantity, None)
+            # Field validators leave the sign to the CHECK constraint on SQLite
+            if quantity < 0:
+                raise ValidationError("Negative quantity")
+        except (InvalidOperation, ValidationError):
+            raise ValueError(
+                f"Invalid price {price} or quantity {quantity} of {name}"
+            ) from None
+        return price, quantity
+
+    def process_products_bulk(self, products_list, supplier, categories_map):
+        """Process products in chunks using set-based reads and bulk writes"""
+        self.write_rows(self.iter_rows(products_list, categories_map), supplier)
+
+    def iter_rows(self, products_list, categories_map):
+        """Parse products lazily, counting and skipping broken items"""
+        for product_data in products_list:
+            try:
+                row = self.parse_product(product_data, categories_map)
+            except Exception as e:
+                self.stats["errors"] += 1
+                self.log(f"Error processing product: {str(e)}", "error")
+                continue
+            if row is not None:
+                yield row
+
+    def write_rows(self, rows, supplier):
+        """Write parsed product rows in chunks of batch_size"""
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self.write_products_batch(batch, supplier)
+                self.report_progress()
+                batch = []
+
+        if batch:
+            self.write_products_batch(batch, supplier)
+            self.report_progress()
+
+    def report_progress(self):
+        """Pass the current stats to the progress callback, if any"""
+        if self.progress_callback is not None:
+            self.progress_callback(dict(self.stats))
+
+    def write_products_batch(self, rows, supplier):
+        """Apply one chunk of parsed products with bulk inserts and upserts"""
+        if self.incremental:
+            rows = self.filter_changed_rows(rows, supplier)
+            if not rows:
+                return
+
+        # Preload products by name; the lowest id wins, as with get_or_create
+        products_by_name = {}
+        for product in Product.objects.filter(
+            name__in={row["name"] for row in rows}
+        ).order_by("-id"):
+            products_by_name[product.name] = product
+
+        to_create = []
+        to_update = {}
+        now = timezone.now()
+        for row in rows:
+            product = products_by_name.get(row["name"])
+            if product is None:
+                product = Product(
+                    name=row["name"],
+                    category=row["category"],
+                    price=row["price"],
+                    quantity=row["quantity"],
+                    description=row["description"],
+                )
+                products_by_name[row["name"]] = product
+                to_create.append(product)
+                self.touched_categories.add(row["category"].pk)
+                self.stats["products_created"] += 1
+                self.log(f"Created product: {row['name']}", "success")
+            else:
+                self.touched_categories.update(
+                    {product.category_id, row["category"].pk}
+                )
+                product.category = row["category"]
+                product.price = row["price"]
+                product.quantity = max(product.quantity, row["quantity"])
+                if row["description"]:
+                    product.description = row["description"]
+                product.updated_at = now
+                if product.pk is not None:
+                    to_update[product.pk] = product
+                self.stats["products_updated"] += 1
+                self.log(f"Updated product: {row['name']}", "info")
+
+        Product.objects.bulk_create(to_create, batch_size=self.batch_size)
+        # An upsert on the primary key is much cheaper than bulk_update's
+        # CASE WHEN expression, which grows with every row in the batch
+        Product.objects.bulk_create(
+            list(to_update.values()),
+            batch_size=self.batch_size,
+            update_conflicts=True,
+            unique_fields=["id"],
+            update_fields=[
+                "category",
+                "price",
+                "quantity",
+                "description",
+                "updated_at",
+            ],
+        )
+        # Bulk writes skip the signals that keep the search index in step
+        get_search_backend().index_products([*to_create, *to_update.values()])
+
+        # Supplier links are keyed by product, the last occurrence in the feed wins
+        links = {}
+        for row in rows:
+            product = products_by_name[row["name"]]
+            links[product.pk] = (product, row["price"], row["quantity"])
+
+        existing_links = set(
+            SupplierProduct.objects.filter(
+                supplier=supplier, product_id__in=list(links)
+            ).values_list("product_id", flat=True)
+        )
+
+        seen = set()
+        for row in rows:
+            product = products_by_name[row["name"]]
+            if product.pk in existing_links or product.pk in seen:
+                self.stats["supplier_products_updated"] += 1
+                self.log(f"Updated supplier product link: {product.name}", "info")
+            else:
+                self.stats["supplier_products_created"] += 1
+                self.log(f"Created supplier product link: {product.name}", "info")
+            seen.add(product.pk)
+
+        SupplierProduct.objects.bulk_create(
+            [
+                SupplierProduct(
+                    supplier=supplier,
+                    product=product,
+                    supplier_price=price,
+                    supplier_quantity=quantity,
+                    is_available=quantity > 0,
+                )
+                for product, price, quantity in links.values()
+            ],
+            batch_size=self.batch_size,
+            update_conflicts=True,
+            unique_fields=["supplier", "product"],
+            update_fields=["supplier_price", "supplier_quantity", "is_available"],
+        )
+        # Bulk writes skip the signals that keep best offers in step
+        refresh_best_offers(list(links))
+
+        # Parameters of every occurrence of a product, merged in feed order
+        # like the per-row upserts: later values win, earlier names are kept
+        parameters = {}
+        for row in rows:
+            product = products_by_name[row["name"]]
+            parameters.setdefault(product.pk, (product, {}))[1].update(
+                row["parameters"]
+            )
+        self.save_product_parameters(parameters.values())
+
+        if self.incremental:
+            self.save_fingerprints(rows, products_by_name, supplier)
+
+    def content_hash(self, row):
+        """Stable hash of everything a parsed good writes to the database"""
+        content = [
+            row["name"],
+            str(row["category"]),
+            str(row["price"]),
+            row["quantity"],
+            row["description"],
+            sorted(row["parameters"].items()),
+        ]
+        return hashlib.sha256(
+            json.dumps(content, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+
+    def filter_changed_rows(self, rows, supplier):
+        """Drop goods whose hash matches the supplier's stored fingerprint"""
+        for row in rows:
+            if row["external_id"]:
+                row["content_hash"] = self.content_hash(row)
+
+        stored = dict(
+            ImportFingerprint.objects.filter(
+                supplier=supplier,
+                external_id__in={
+                    row["external_id"] for row in rows if row["external_id"]
+                },
+            ).values_list("external_id", "content_hash")
+        )
+
+        changed = []
+        unchanged_ids = set()
+        for row in rows:
+            external_id = row["external_id"]
+            if external_id and stored.get(external_id) == row["content_hash"]:
+                unchanged_ids.add(external_id)
+                self.stats["goods_unchanged"] += 1
+            else:
+                changed.append(row)
+                self.stats["goods_changed"] += 1
+
+        if unchanged_ids:
+            ImportFingerprint.objects.filter(
+                supplier=supplier, external_id__in=unchanged_ids
+            ).update(last_seen_at=self.started_at)
+
+        return changed
+
+    def save_fingerprints(self, rows, products_by_name, supplier):
+        """Upsert fingerprints of the goods written in this batch"""
+        fingerprints = {}
+        for row in rows:
+            if row["external_id"]:
+                fingerprints[row["external_id"]] = ImportFingerprint(
+                    supplier=supplier,
+                    product=products_by_name[row["name"]],
+                    external_id=row["external_id"],
+                    content_hash=row["content_hash"],
+                    last_seen_at=self.started_at,
+                )
+
+        ImportFingerprint.objects.bulk_create(
+            list(fingerprints.values()),
+            batch_size=self.batch_size,
+            update_conflicts=True,
+            unique_fields=["supplier", "external_id"],
+            update_fields=["product", "content_hash", "last_seen_at"],
+        )
+
+    def preload_parameters(self):
+        """Load every existing parameter into the importer's cache"""
+        self.parameter_cache = {
+            parameter.name: parameter for parameter in Parameter.objects.all()
+        }
+
+    def get_parameters(self, names):
+        """Resolve parameter names to Parameters, creating missing ones in bulk"""
+        if self.parameter_cache is None:
+            self.preload_parameters()
+
+        missing = [name for name in names if name not in self.parameter_cache]
+        if missing:
+            # Another import may create the same names, so re-read after insert
+            Parameter.objects.bulk_create(
+                [Parameter(name=name) for name in missing], ignore_conflicts=True
+            )
+            for parameter in Parameter.objects.filter(name__in=missing):
+                self.parameter_cache[parameter.name] = parameter
+            self.stats["parameters_created"] += len(missing)
+            self.log(f"Created parameters: {', '.join(missing)}", "success")
+
+        return {name: self.parameter_cache[name] for name in names}
+
+    def save_product_parameters(self, product_parameters):
+        """Upsert ProductParameter rows for (product, {name: value}) pairs"""
+        product_parameters = [
+            (product, values) for product, values in product_parameters if values
+        ]
+        if not product_parameters:
+            return
+
+        names = {name for _, values in product_parameters for name in values}
+        parameters = self.get_parameters(sorted(names))
+
+        objs = [
+            ProductParameter(product=product, parameter=parameters[name], value=value)
+            for product, values in product_parameters
+            for name, value in values.items()
+        ]
+        ProductParameter.objects.bulk_create(
+            objs,
+            batch_size=self.batch_size,
+            update_conflicts=True,
+            unique_fields=["product", "parameter"],
+            update_fields=["value"],
+        )
+        self.stats["product_parameters_written"] += len(objs)
+        get_search_backend().index_parameters(
+            {product.pk for product, _ in product_parameters}
+        )
+
     def extract_value(self, data, keys):
         """Extract value using multiple possible keys"""
         for key in keys:
@@ -238,7 +720,11 @@ class YAMLImporter:
             return categories_map[cat_name]
 
         # Default category
-        return Category.objects.get_or_create(name="Uncategorized")[0]
+        return self.get_default_category()
+
+    def get_default_category(self):
+        """Category for products without a mapped category"""
+        return self.get_category("Uncategorized")[0]
 
     def extract_price(self, product_data):
         """Extract price from product data"""
@@ -297,12 +783,7 @@ class YAMLImporter:
             return desc
 
         # Build from parameters
-        params = None
-        for key in ["parameters", "Parameters", "params", "Params", "specs"]:
-            if key in product_data:
-                params = product_data[key]
-                break
-
+        params = self.find_parameters(product_data)
         if params:
             if isinstance(params, dict):
                 return ", ".join([f"{k}: {v}" for k, v in params.items()])
@@ -311,6 +792,28 @@ class YAMLImporter:
 
         return ""
 
+    def find_parameters(self, product_data):
+        """Return the raw parameters value of a product, if any"""
+        for key in ["parameters", "Parameters", "params", "Params", "specs"]:
+            if key in product_data:
+                return product_data[key]
+        return None
+
+    def extract_parameters(self, product_data):
+        """Extract parameters as a {name: value} dict of strings"""
+        params = self.find_parameters(product_data)
+        if not isinstance(params, dict):
+            return {}
+
+        parameters = {}
+        for name, value in params.items():
+            if name is None or value is None:
+                continue
+            name = str(name).strip()[:100]
+            if name:
+                parameters[name] = str(value).strip()[:255]
+        return parameters
+
     def create_or_update_product(self, name, category, price, quantity, description):
         """Create or update a product"""
         product, created = Product.objects.get_or_create(
@@ -323,6 +826,7 @@ class YAMLImporter:
             },
         )
 
+        self.touched_categories.update({product.category_id, category.pk})
         if not created:
             # Update existing product
             product.category = category
@@ -0,0 +1,109 @@
+import yaml
+from yaml.composer import Composer
+from yaml.constructor import SafeConstructor
+from yaml.resolver import Resolver
+
+try:
+    from yaml.cyaml import CParser
+
+    class StreamLoader(CParser, Composer, SafeConstructor, Resolver):
+        """libyaml event parser with the pure-Python composer on top"""
+
+        def __init__(self, stream):
+            CParser.__init__(self, stream)
+            Composer.__init__(self)
+            SafeConstructor.__init__(self)
+            Resolver.__init__(self)
+
+except ImportError:  # PyYAML built without libyaml
+    StreamLoader = yaml.SafeLoader
+
+
+PRODUCT_KEYS = ["goods", "products", "Goods", "Products", "items", "Items"]
+
+
+class YAMLStreamReader:
+    """
+    Walk a YAML feed event by event instead of loading it as a whole.
+
+    Shops are yielded as ``(shop_data, goods)`` where ``shop_data`` holds
+    every key read before the goods list and ``goods`` is an iterator that
+    constructs one good at a time, so only a single good is in memory.
+    Keys placed after the goods list (e.g. categories at the end of the
+    shop) are skipped.
+    """
+
+    def __init__(self, stream):
+        self.loader = StreamLoader(stream)
+
+    def close(self):
+        self.loader.dispose()
+
+    def iter_shops(self):
+        """Yield (shop_data, goods_iterator) for every shop in the feed"""
+        loader = self.loader
+        loader.get_event()  # StreamStart
+
+        while not loader.check_event(yaml.StreamEndEvent):
+            loader.get_event()  # DocumentStart
+
+            if loader.check_event(yaml.SequenceStartEvent):
+                # List of shops
+                loader.get_event()
+                while not loader.check_event(yaml.SequenceEndEvent):
+                    yield from self.read_shop()
+                loader.get_event()
+            elif loader.check_event(yaml.MappingStartEvent):
+                # Single shop
+                yield from self.read_shop()
+            else:
+                # Empty document or scalar, nothing to import
+                self.construct_next()
+
+            loader.get_event()  # DocumentEnd
+            loader.anchors = {}
+
+    def read_shop(self):
+        """Read one shop mapping, streaming its goods sequence"""
+        loader = self.loader
+        if not loader.check_event(yaml.MappingStartEvent):
+            # Not a shop; hand it back so the importer can report and skip it
+            yield self.construct_next(), iter(())
+            return
+
+        loader.get_event()
+        shop_data = {}
+        while not loader.check_event(yaml.MappingEndEvent):
+            key = self.construct_next()
+            if (
+                shop_data is not None
+                and key in PRODUCT_KEYS
+                and loader.check_event(yaml.SequenceStartEvent)
+            ):
+                goods = self.iter_goods()
+                yield shop_data, goods
+                # Skip whatever the caller left unread before the next key
+                for _ in goods:
+                    pass
+                shop_data = None
+            elif shop_data is not None:
+                shop_data[key] = self.construct_next()
+            else:
+                self.construct_next()
+        loader.get_event()
+
+        if shop_data is not None:
+            yield shop_data, iter(())
+
+    def iter_goods(self):
+        """Construct goods one at a time from the current sequence"""
+        loader = self.loader
+        loader.get_event()  # SequenceStart
+        while not loader.check_event(yaml.SequenceEndEvent):
+            yield self.construct_next()
+        loader.get_event()
+
+    def construct_next(self):
+        """Compose and construct the node at the current position"""
+        node = self.loader.compose_node(None, None)
+        return self.loader.construct_document(node)
@@ -1,14 +1,33 @@
-from decimal import Decimal
-import yaml
-from django.db.models import Count
-from django.core.files.storage import default_storage
+from django.conf import settings
+from django.core.cache import cache
+from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, permissions, viewsets, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
-
-from .models import Category, Product
-from .serializers import CategorySerializer, ProductSerializer
+from rest_framework.reverse import reverse
+
+from .cache import cache_catalog_response, get_cache_stats, reset_cache_stats
+from .facets import (
+    category_counts,
+    filter_by_parameters,
+    get_parameter_filters,
+    get_precomputed_category,
+    group_facets,
+    live_facets,
+    precomputed_facets,
+)
+from .fieldsets import SparseFieldsetViewMixin
+from .models import Category, ImportJob, Product
+from .pagination import CatalogPagination
+from .search import ProductSearchFilter
+from .serializers import (
+    CategorySerializer,
+    ImportJobSerializer,
+    ProductReadSerializer,
+    ProductSerializer,
+)
+from .tasks import start_import_job
 
 
 class CategoryViewSet(viewsets.ModelViewSet):
@@ -24,45 +43,63 @@ class CategoryViewSet(viewsets.ModelViewSet):
     ordering_fields = ["name"]
     ordering = ["name"]
 
+    @cache_catalog_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
     @action(detail=True, methods=["get"])
     def products(self, request, pk=None):
         """Get all active products for this category"""
         category = self.get_object()
         products = category.products.filter(is_active=True)
-        serializer = ProductSerializer(products, many=True)
+        fieldset = ProductReadSerializer.get_fieldset(request)
+        if fieldset is None:
+            products = products.with_details()
+        else:
+            # The related manager reads category_id of every product
+            products = products.for_fieldset(fieldset, keep=["category"])
+        serializer = ProductReadSerializer(
+            products,
+            many=True,
+            fieldset=fieldset,
+            context=self.get_serializer_context(),
+        )
         return Response(serializer.data)
 
     @action(detail=False, methods=["get"])
+    @cache_catalog_response
     def categories_summary(self, request):
         """
-        Summary of categories with count of products
+        Categories that have active products, with their counts
         """
-        categories = Category.objects.annotate(product_count=Count("products"))
-        data = [
-            {"id": cat.id, "name": cat.name, "product_count": cat.product_count}
-            for cat in categories
-            if cat.product_count > 0
-        ]
-        return Response(data)
+        return Response(list(category_counts()))
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """
-    CRUD for products with filtering, search, and ordering
+    CRUD for products with filtering, search, ordering and sparse fieldsets
     """
 
-    queryset = Product.objects.filter(is_active=True)
+    queryset = Product.objects.filter(is_active=True).with_details()
     serializer_class = ProductSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = CatalogPagination
+    # ProductSearchFilter orders by relevance, so it runs after OrderingFilter
     filter_backends = [
         DjangoFilterBackend,
-        filters.SearchFilter,
         filters.OrderingFilter,
+        ProductSearchFilter,
     ]
     filterset_fields = ["category", "is_active"]
-    search_fields = ["name", "description"]
     ordering_fields = ["name", "price", "created_at", "quantity"]
     ordering = ["-created_at"]
+    # Read-only actions that use the fast serializer
+    read_actions = {"list", "featured"}
+
+    def get_serializer_class(self):
+        if self.action in self.read_actions:
+            return ProductReadSerializer
+        return super().get_serializer_class()
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -80,8 +117,22 @@ class ProductViewSet(viewsets.ModelViewSet):
         if in_stock and in_stock.lower() == "true":
             queryset = queryset.filter(quantity__gt=0)
 
+        # Filter by parameter values: ?param.<name>=<value>
+        queryset = filter_by_parameters(
+            queryset, get_parameter_filters(self.request.query_params)
+        )
+
+        # ?fields= / ?expand=; the ordering columns stay loaded for cursors
+        fieldset = self.get_fieldset()
+        if fieldset is not None:
+            queryset = queryset.for_fieldset(fieldset, keep=self.ordering_fields)
+
         return queryset
 
+    @cache_catalog_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
     @action(detail=False, methods=["get"])
     def featured(self, request):
         """Return first 10 featured products"""
@@ -89,71 +140,97 @@ class ProductViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(featured_products, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=["get"])
+    def facets(self, request):
+        """
+        Parameter value counts for the products matching the current filters,
+        read from the precomputed facet table when only category is filtered
+        """
+        try:
+            limit = int(request.query_params.get("facet_limit", 20))
+        except ValueError:
+            limit = 20
+
+        category_id = get_precomputed_category(request.query_params)
+        if category_id is not None:
+            rows = precomputed_facets(category_id)
+        else:
+            rows = live_facets(self.filter_queryset(self.get_queryset()))
+
+        return Response(
+            {
+                "precomputed": category_id is not None,
+                "facets": group_facets(rows, limit),
+            }
+        )
+
 
 @api_view(["POST"])
 @permission_classes([permissions.IsAdminUser])
 def import_yaml(request):
     """
     Admin-only endpoint to import categories and products from a YAML file.
-    Expects uploaded file in 'file' field.
+    Expects uploaded file in 'file' field. The import runs as a background
+    job; poll the returned status_url for progress.
     """
+    max_size = settings.YAML_IMPORT_MAX_UPLOAD_SIZE
+    too_large = Response(
+        {"error": f"File is larger than {max_size} bytes"},
+        status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+    )
+
+    # Reject oversized requests before the body is read
+    if int(request.META.get("CONTENT_LENGTH") or 0) > max_size:
+        return too_large
+
     if "file" not in request.FILES:
         return Response(
             {"error": "No file provided"}, status=status.HTTP_400_BAD_REQUEST
         )
 
     file = request.FILES["file"]
-    supplier_name = request.data.get("supplier", "Imported Supplier")  # for future use
-
-    try:
-        # Read YAML content
-        content = file.read().decode("utf-8")
-        data = yaml.safe_load(content)
-
-        imported_count = 0
-
-        if isinstance(data, list):
-            for shop in data:
-                if isinstance(shop, dict):
-                    # Process categories
-                    categories = {}
-                    for cat_data in shop.get("categories", []):
-                        if isinstance(cat_data, dict):
-                            cat_id = cat_data.get("id")
-                            cat_name = cat_data.get("name")
-                            if cat_name:
-                                category, _ = Category.objects.get_or_create(name=cat_name)
-                                categories[cat_id] = category
-
-                    # Process products
-                    for product_data in shop.get("goods", []):
-                        if isinstance(product_data, dict):
-                            name = product_data.get("name")
-                            category_id = product_data.get("category")
-                            price = product_data.get("price", 0)
-
-                            if name and category_id in categories:
-                                product, created = Product.objects.get_or_create(
-                                    name=name,
-                                    defaults={
-                                        "category": categories[category_id],
-                                        "price": Decimal(str(price)),
-                                        "quantity": product_data.get("quantity", 0),
-                                        "description": str(
-                                            product_data.get("parameters", {})
-                                        ),
-                                    },
-                                )
-                                if created:
-                                    imported_count += 1
+    if file.size > max_size:
+        return too_large
+
+    job = start_import_job(
+        file,
+        request.data.get("supplier", "Imported Supplier"),
+        user=request.user,
+    )
+
+    return Response(
+        {
+            "job_id": job.pk,
+            "status": job.status,
+            "status_url": reverse("import-yaml-status", args=[job.pk], request=request),
+        },
+        status=status.HTTP_202_ACCEPTED,
+    )
+
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAdminUser])
+def import_yaml_status(request, pk):
+    """
+    Status of an import job, with live stats while it is running
+    """
+    job = get_object_or_404(ImportJob, pk=pk)
+    data = ImportJobSerializer(job).data
 
-        return Response(
-            {
-                "success": True,
-                "message": f"Successfully imported {imported_count} products",
-                "count": imported_count,
-            }
-        )
+    if job.status == ImportJob.Status.RUNNING:
+        data["stats"] = cache.get(job.progress_cache_key, data["stats"])
+
+    return Response(data)
 
-    except Exception as e:
-        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAdminUser])
+def catalog_cache_stats(request):
+    """
+    Admin-only hit ratio of the catalog response cache; ?reset=true
+    clears the counters after reading them
+    """
+    stats = get_cache_stats()
+    if request.query_params.get("reset", "").lower() == "true":
+        reset_cache_stats()
+    return Response(stats)
@@ -0,0 +1,11 @@
+import os
+
+from celery import Celery
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "purchasing_backend.settings")
+
+app = Celery("purchasing_backend")
+
+# All CELERY_* settings from settings.py
+app.config_from_object("django.conf:settings", namespace="CELERY")
+app.autodiscover_tasks()
@@ -2,6 +2,7 @@ import os
 from datetime import timedelta
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -104,6 +105,9 @@ else:
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
+            # A file rather than SQLite's in-memory default, whose shared
+            # cache fails concurrent writers instead of making them wait
+            "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
         }
     }
 
@@ -199,6 +203,80 @@ DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", "noreply@local")
 ADMIN_EMAIL = os.getenv("ADMIN_EMAIL", "admin@local")
 
 
+# =========================
+# YAML import
+# =========================
+# Largest feed accepted by the API and admin import, in bytes (default 1 GB)
+YAML_IMPORT_MAX_UPLOAD_SIZE = int(
+    os.getenv("YAML_IMPORT_MAX_UPLOAD_SIZE", str(1024 * 1024 * 1024))
+)
+
+# Spool every upload to a temporary file instead of keeping it in memory
+FILE_UPLOAD_HANDLERS = [
+    "django.core.files.uploadhandler.TemporaryFileUploadHandler",
+]
+
+
+# =========================
+# Cart
+# =========================
+# Most operations one POST /api/cart/batch/ may carry
+CART_BATCH_MAX_OPERATIONS = int(os.getenv("CART_BATCH_MAX_OPERATIONS", "500"))
+
+
+# =========================
+# Cache
+# =========================
+# "file" shares entries between the web processes and the Celery worker of
+# one host, which the catalog version and import progress rely on; "locmem"
+# keeps them per process and is only allowed with DEBUG
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "file")
+
+if CACHE_BACKEND != "file" and not DEBUG:
+    raise ImproperlyConfigured(
+        f"CACHE_BACKEND={CACHE_BACKEND!r} keeps the cache per process; "
+        "use CACHE_BACKEND=file unless DJANGO_DEBUG=1"
+    )
+
+if CACHE_BACKEND == "file":
+    CACHE_LOCATION = os.getenv("CACHE_LOCATION", str(BASE_DIR / "cache"))
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": CACHE_LOCATION,
+        },
+        # The catalog version and hit counters never expire and live in a
+        # directory of their own, so culling cached responses cannot drop them
+        "catalog": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.path.join(CACHE_LOCATION, "catalog"),
+            "TIMEOUT": None,
+        },
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+        "catalog": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "catalog",
+            "TIMEOUT": None,
+        },
+    }
+
+# Seconds a cached catalog response is kept; entries are also invalidated
+# whenever the catalog changes
+CATALOG_CACHE_TIMEOUT = int(os.getenv("CATALOG_CACHE_TIMEOUT", "300"))
+
+
+# =========================
+# Product search
+# =========================
+# Dotted path to a products.search backend; empty picks one for DB_ENGINE
+PRODUCT_SEARCH_BACKEND = os.getenv("PRODUCT_SEARCH_BACKEND", "")
+
+
 # =========================
 # Celery (advanced part, harmless if not used yet)
 # =========================
@@ -208,3 +286,8 @@ CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = TIME_ZONE
+# Tasks go to the broker and run in a worker; set to 1 (the default with
+# DJANGO_DEBUG=1) to run them in-process where no worker is running
+CELERY_TASK_ALWAYS_EAGER = (
+    os.getenv("CELERY_TASK_ALWAYS_EAGER", "1" if DEBUG else "0") == "1"
+)
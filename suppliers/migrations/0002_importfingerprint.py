@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-17 08:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0002_parameter_productparameter"),
+        ("suppliers", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportFingerprint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "external_id",
+                    models.CharField(max_length=100, verbose_name="Feed good id"),
+                ),
+                (
+                    "content_hash",
+                    models.CharField(max_length=64, verbose_name="Content hash"),
+                ),
+                ("last_seen_at", models.DateTimeField(verbose_name="Last seen at")),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="import_fingerprints",
+                        to="products.product",
+                        verbose_name="Product",
+                    ),
+                ),
+                (
+                    "supplier",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="import_fingerprints",
+                        to="suppliers.supplier",
+                        verbose_name="Supplier",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Import fingerprint",
+                "verbose_name_plural": "Import fingerprints",
+                "unique_together": {("supplier", "external_id")},
+            },
+        ),
+    ]
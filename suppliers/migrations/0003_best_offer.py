@@ -0,0 +1,82 @@
+# Generated by Django 4.2.7 on 2026-10-17 09:52
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def fill_best_offers(apps, schema_editor):
+    BestOffer = apps.get_model("suppliers", "BestOffer")
+    Product = apps.get_model("products", "Product")
+    SupplierProduct = apps.get_model("suppliers", "SupplierProduct")
+    best = SupplierProduct.objects.filter(
+        product=OuterRef("pk"),
+        is_available=True,
+        supplier__accepts_orders=True,
+        supplier_quantity__gt=0,
+    ).order_by("supplier_price", "pk")
+    offers = (
+        Product.objects.annotate(offer_id=Subquery(best.values("pk")[:1]))
+        .filter(offer_id__isnull=False)
+        .order_by()
+        .values_list("pk", "offer_id")
+    )
+    BestOffer.objects.bulk_create(
+        (
+            BestOffer(product_id=product_id, supplier_product_id=offer_id)
+            for product_id, offer_id in offers.iterator()
+        ),
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0007_category_active_product_count"),
+        ("suppliers", "0002_importfingerprint"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BestOffer",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="best_offer",
+                        serialize=False,
+                        to="products.product",
+                        verbose_name="Product",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Best offer",
+                "verbose_name_plural": "Best offers",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="supplierproduct",
+            index=models.Index(
+                condition=models.Q(
+                    ("is_available", True), ("supplier_quantity__gt", 0)
+                ),
+                fields=["product", "supplier_price", "id"],
+                name="supplierproduct_best_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="bestoffer",
+            name="supplier_product",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="suppliers.supplierproduct",
+                verbose_name="Supplier product",
+            ),
+        ),
+        migrations.RunPython(fill_best_offers, migrations.RunPython.noop),
+    ]
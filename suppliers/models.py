@@ -1,5 +1,7 @@
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
 
 
 class Supplier(models.Model):
@@ -54,6 +56,151 @@ class SupplierProduct(models.Model):
         verbose_name = "Supplier Product"
         verbose_name_plural = "Supplier Products"
         unique_together = ["supplier", "product"]
+        indexes = [
+            # Cheapest offer in stock per product, see suppliers.offers
+            models.Index(
+                fields=["product", "supplier_price", "id"],
+                condition=models.Q(is_available=True, supplier_quantity__gt=0),
+                name="supplierproduct_best_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.supplier.name} - {self.product.name}"
+
+
+class BestOffer(models.Model):
+    """
+    The supplier product cart lines of a product are ordered through when
+    none is chosen; kept up to date by the signals below and by imports,
+    see suppliers.offers.refresh_best_offers
+    """
+
+    product = models.OneToOneField(
+        "products.Product",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="best_offer",
+        verbose_name="Product",
+    )
+    supplier_product = models.ForeignKey(
+        SupplierProduct,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Supplier product",
+    )
+
+    class Meta:
+        verbose_name = "Best offer"
+        verbose_name_plural = "Best offers"
+
+    def __str__(self):
+        return f"{self.product_id} - {self.supplier_product_id}"
+
+
+class ImportFingerprint(models.Model):
+    """Content hash of a feed good from the supplier's last incremental import"""
+
+    supplier = models.ForeignKey(
+        Supplier,
+        on_delete=models.CASCADE,
+        related_name="import_fingerprints",
+        verbose_name="Supplier",
+    )
+    product = models.ForeignKey(
+        "products.Product",
+        on_delete=models.CASCADE,
+        related_name="import_fingerprints",
+        verbose_name="Product",
+    )
+    external_id = models.CharField(max_length=100, verbose_name="Feed good id")
+    content_hash = models.CharField(max_length=64, verbose_name="Content hash")
+    last_seen_at = models.DateTimeField(verbose_name="Last seen at")
+
+    class Meta:
+        verbose_name = "Import fingerprint"
+        verbose_name_plural = "Import fingerprints"
+        unique_together = ["supplier", "external_id"]
+
+    def __str__(self):
+        return f"{self.supplier.name} - {self.external_id}"
+
+
+# Supplier offers are part of the catalog responses cached by products.cache
+@receiver(post_save, sender=SupplierProduct)
+@receiver(post_delete, sender=SupplierProduct)
+def invalidate_catalog_cache(sender, **kwargs):
+    from products.cache import bump_catalog_version_on_commit
+
+    bump_catalog_version_on_commit()
+
+
+# Keep BestOffer in step with offer and supplier edits
+OFFER_FIELDS = {"product", "supplier_price", "supplier_quantity", "is_available"}
+OFFER_COLUMNS = ["product_id", "supplier_price", "supplier_quantity", "is_available"]
+
+
+def changes_fields(update_fields, fields):
+    return update_fields is None or not set(fields).isdisjoint(update_fields)
+
+
+def offer_standing(values):
+    """
+    What a product's best offer depends on, from OFFER_COLUMNS values: the
+    stock level only matters as in stock or not
+    """
+    product_id, price, quantity, is_available = values
+    price = SupplierProduct._meta.get_field("supplier_price").to_python(price)
+    return product_id, price, int(quantity) > 0, is_available
+
+
+@receiver(pre_save, sender=SupplierProduct)
+def remember_offer(sender, instance, update_fields=None, **kwargs):
+    instance._previous_offer = None
+    if not instance._state.adding and changes_fields(update_fields, OFFER_FIELDS):
+        instance._previous_offer = (
+            SupplierProduct.objects.filter(pk=instance.pk)
+            .values_list(*OFFER_COLUMNS)
+            .first()
+        )
+
+
+@receiver(post_save, sender=SupplierProduct)
+def refresh_offer(sender, instance, update_fields=None, **kwargs):
+    from .offers import refresh_best_offers
+
+    if not changes_fields(update_fields, OFFER_FIELDS):
+        return
+    previous = getattr(instance, "_previous_offer", None)
+    current = [getattr(instance, column) for column in OFFER_COLUMNS]
+    # Re-saves that keep the offer's standing, like re-imports, change nothing
+    if previous is not None and offer_standing(previous) == offer_standing(current):
+        return
+    refresh_best_offers({instance.product_id, previous and previous[0]} - {None})
+
+
+@receiver(post_delete, sender=SupplierProduct)
+def drop_offer(sender, instance, **kwargs):
+    from .offers import refresh_best_offers
+
+    refresh_best_offers([instance.product_id])
+
+
+@receiver(pre_save, sender=Supplier)
+def remember_accepts_orders(sender, instance, update_fields=None, **kwargs):
+    instance._previous_accepts_orders = None
+    if not instance._state.adding and changes_fields(update_fields, ["accepts_orders"]):
+        instance._previous_accepts_orders = (
+            Supplier.objects.filter(pk=instance.pk)
+            .values_list("accepts_orders", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Supplier)
+def refresh_supplier_offers(sender, instance, **kwargs):
+    from .offers import refresh_best_offers
+
+    previous = getattr(instance, "_previous_accepts_orders", None)
+    if previous is not None and previous != instance.accepts_orders:
+        refresh_best_offers(instance.supplier_products.values("product_id"))
@@ -0,0 +1,81 @@
+"""
+Supplier offers cart lines are ordered through.
+
+A product's best offer is its cheapest supplier product that is available,
+in stock and from a supplier that accepts orders, the oldest one on a tie.
+BestOffer stores it per product so that cart writes pick the supplier with
+a primary key lookup. The SupplierProduct and Supplier signals keep it up
+to date, and imports refresh it for the supplier's products.
+"""
+
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+from products.models import Product
+
+from .models import BestOffer, SupplierProduct
+
+OFFER_BATCH_SIZE = 5000
+
+
+def orderable_offers(**filters):
+    """
+    Supplier products a cart line can be ordered through, first one first;
+    filters narrow them down, e.g. product=OuterRef("pk")
+    """
+    return SupplierProduct.objects.filter(
+        is_available=True, supplier__accepts_orders=True, **filters
+    ).order_by("pk")
+
+
+def best_offers(**filters):
+    """Orderable supplier products in stock, best offer first"""
+    return orderable_offers(supplier_quantity__gt=0, **filters).order_by(
+        "supplier_price", "pk"
+    )
+
+
+def best_offer_id(product_id):
+    """The stored best offer of a product, or None"""
+    return (
+        BestOffer.objects.filter(product_id=product_id)
+        .values_list("supplier_product_id", flat=True)
+        .first()
+    )
+
+
+def refresh_best_offers(product_ids=None):
+    """
+    Recompute the best offers of some products, or of every product;
+    product_ids may be a list or a values() queryset
+    """
+    products = Product.objects.all()
+    stored = BestOffer.objects.all()
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+        stored = stored.filter(product_id__in=product_ids)
+
+    offers = (
+        products.annotate(
+            offer_id=Subquery(best_offers(product=OuterRef("pk")).values("pk")[:1])
+        )
+        .filter(offer_id__isnull=False)
+        .order_by()
+        .values_list("pk", "offer_id")
+    )
+    rows = (
+        BestOffer(product_id=product_id, supplier_product_id=offer_id)
+        for product_id, offer_id in offers.iterator(chunk_size=OFFER_BATCH_SIZE)
+    )
+    with transaction.atomic():
+        stored.exclude(product_id__in=offers.values("pk")).delete()
+        # bulk_create would turn a generator into one list of every product
+        while batch := list(islice(rows, OFFER_BATCH_SIZE)):
+            BestOffer.objects.bulk_create(
+                batch,
+                update_conflicts=True,
+                unique_fields=["product"],
+                update_fields=["supplier_product"],
+            )
@@ -1,12 +1,13 @@
 from rest_framework import serializers
 
+from products.fieldsets import SparseFieldsetMixin
 from products.models import Product
 from products.serializers import ProductSerializer
 
 from .models import Supplier, SupplierProduct
 
 
-class SupplierProductSerializer(serializers.ModelSerializer):
+class SupplierProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     # Nested product info for read operations
     product = ProductSerializer(read_only=True)
     # For write operations (POST/PUT)
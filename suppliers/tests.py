@@ -1,3 +1,59 @@
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
-# Create your tests here.
+from products.models import Category, Product
+from products.tests import LOCMEM_CACHES
+
+from .models import BestOffer, Supplier, SupplierProduct
+from .offers import best_offer_id
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class BestOfferRefreshTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Phones")
+        self.product, self.other = (
+            Product.objects.create(name=name, category=category, price=10)
+            for name in ["Phone", "Other phone"]
+        )
+        self.cheap, self.dear = (
+            SupplierProduct.objects.create(
+                supplier=Supplier.objects.create(name=name, email="s@example.com"),
+                product=self.product,
+                supplier_price=price,
+                supplier_quantity=10,
+            )
+            for name, price in [("Cheap", 5), ("Dear", 8)]
+        )
+
+    def save_refreshes(self, offer):
+        table = BestOffer._meta.db_table
+        with CaptureQueriesContext(connection) as queries:
+            offer.save()
+        return any(f'"{table}"' in query["sql"] for query in queries)
+
+    def test_saves_that_keep_the_offer_standing_do_not_refresh(self):
+        self.assertFalse(self.save_refreshes(self.cheap))
+        self.cheap.supplier_price = "5.00"
+        self.cheap.supplier_quantity = 3
+        self.assertFalse(self.save_refreshes(self.cheap))
+
+    def test_changes_to_price_stock_availability_and_product_refresh(self):
+        self.cheap.supplier_price = 9
+        self.assertTrue(self.save_refreshes(self.cheap))
+        self.assertEqual(best_offer_id(self.product.pk), self.dear.pk)
+
+        self.dear.supplier_quantity = 0
+        self.assertTrue(self.save_refreshes(self.dear))
+        self.assertEqual(best_offer_id(self.product.pk), self.cheap.pk)
+
+        self.cheap.is_available = False
+        self.assertTrue(self.save_refreshes(self.cheap))
+        self.assertIsNone(best_offer_id(self.product.pk))
+
+        self.cheap.is_available = True
+        self.cheap.product = self.other
+        self.assertTrue(self.save_refreshes(self.cheap))
+        self.assertEqual(best_offer_id(self.other.pk), self.cheap.pk)
+        self.assertIsNone(best_offer_id(self.product.pk))
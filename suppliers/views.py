@@ -1,5 +1,9 @@
+from django.db.models import Prefetch
 from rest_framework import generics, permissions
 
+from products.fieldsets import SparseFieldsetViewMixin
+from products.models import ProductParameter
+
 from .models import Supplier, SupplierProduct
 from .serializers import SupplierSerializer, SupplierProductSerializer
 
@@ -25,16 +29,33 @@ class SupplierDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
 
-class SupplierProductListCreateView(generics.ListCreateAPIView):
+class SupplierProductListCreateView(
+    SparseFieldsetViewMixin, generics.ListCreateAPIView
+):
     """
-    List all supplier products.
+    List all supplier products, with sparse fieldsets (?fields=, ?expand=).
     Allow authenticated users to link products to suppliers.
     """
 
-    queryset = SupplierProduct.objects.select_related("supplier", "product")
     serializer_class = SupplierProductSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_queryset(self):
+        queryset = SupplierProduct.objects.all()
+        fieldset = self.get_fieldset()
+        if fieldset is not None:
+            queryset = queryset.only("id", *fieldset.fields)
+            if not fieldset.expands("product"):
+                return queryset
+
+        # Everything the nested ProductSerializer renders
+        return queryset.select_related("product__category").prefetch_related(
+            Prefetch(
+                "product__parameters",
+                queryset=ProductParameter.objects.select_related("parameter"),
+            )
+        )
+
 
 class SupplierProductDetailView(generics.RetrieveUpdateDestroyAPIView):
     """